@@ -9,14 +9,123 @@ database_opts = [
     cfg.StrOpt('password', default=None, help='The password with which the database can connect to'),
     cfg.StrOpt('database', default='admin', help='The auth database to which the connection is made.'),
     cfg.StrOpt('name', default='crypto_db', help='The auth database to which the connection is made.'),
-    cfg.StrOpt('collection_name', default='coin_details', help='The auth database to which the connection is made.')
+    cfg.StrOpt('collection_name', default='coin_details', help='The auth database to which the connection is made.'),
+    cfg.StrOpt('uri', default=None, help='Full MongoDB connection URI; overrides the default mongodb host.'),
+    cfg.IntOpt('max_pool_size', default=100, help='Maximum number of connections in the shared client pool.'),
+    cfg.IntOpt('min_pool_size', default=0, help='Minimum number of connections kept open in the shared client pool.'),
+    cfg.IntOpt('max_idle_time_ms', default=None, help='Milliseconds a pooled connection may stay idle before it is closed.'),
+    cfg.IntOpt('wait_queue_timeout_ms', default=None, help='Milliseconds a request waits for a free pooled connection.'),
+    cfg.IntOpt('connect_timeout_ms', default=20000, help='Milliseconds allowed to establish a connection.'),
+    cfg.IntOpt('socket_timeout_ms', default=None, help='Milliseconds allowed for a send or receive on a socket.'),
+    cfg.IntOpt('server_selection_timeout_ms', default=30000, help='Milliseconds allowed to find a suitable server.'),
+    cfg.IntOpt('bulk_batch_size', default=500, help='Number of buffered writes that triggers a bulk_write flush.'),
+    cfg.FloatOpt('bulk_flush_interval', default=5.0, help='Seconds after which buffered writes are flushed regardless of batch size.'),
+    cfg.IntOpt('export_batch_size', default=500, help='Number of coins fetched per cursor batch by the streaming export.'),
+    cfg.IntOpt('max_page_size', default=500, help='Largest number of coins a cursor paginated page may hold.'),
+    cfg.IntOpt('count_cache_size', default=256, help='Maximum number of filtered coin counts kept between data refreshes.'),
+    cfg.IntOpt('count_cache_ttl', default=300, help='Seconds a cached coin count is served before it is counted again.')
 ]
 
 token_opts = [
-    cfg.StrOpt('JWT_SECRET_KEY', default="", help="jwt secret key")
+    cfg.StrOpt('JWT_SECRET_KEY', default="", help="jwt secret key"),
+    cfg.IntOpt('cache_size', default=10000, help='Maximum number of verified tokens kept in the authentication cache.'),
+    cfg.IntOpt('cache_ttl', default=60, help='Seconds a verified token is trusted before the user is looked up again.')
+]
+refresh_opts = [
+    cfg.IntOpt('checkpoint_interval', default=500, help='Number of processed coins between two persisted refresh checkpoints.'),
+    cfg.IntOpt('max_recorded_errors', default=100, help='Number of most recent coin errors kept on a refresh job.'),
+    cfg.IntOpt('schedule_interval', default=0, help='Seconds between scheduled data refreshes; 0 disables the scheduler.'),
+    cfg.IntOpt('shard_count', default=1, help='Number of shards the coin list is split into so replicas can share a refresh.'),
+    cfg.IntOpt('lease_ttl', default=120, help='Seconds a shard lease stays valid without being renewed.'),
+    cfg.IntOpt('shard_min_age', default=600, help='Seconds a completed shard is left alone before it may be refreshed again.')
+]
+
+storage_opts = [
+    cfg.ListOpt('hot_fields',
+                default=['id', 'symbol', 'name', 'categories', 'image', 'market_cap_rank', 'last_updated',
+                         'market_data.current_price', 'market_data.market_cap', 'market_data.total_volume',
+                         'market_data.price_change_percentage_24h', 'market_data.price_change_percentage_7d',
+                         'market_data.market_cap_change_percentage_24h', 'market_data.last_updated'],
+                help='Coin fields, as dotted paths, kept in the coin details collection.'),
+    cfg.StrOpt('archive_collection', default='coin_details_archive',
+               help='Collection receiving the remaining coin fields; empty to drop them.')
+]
+
+password_opts = [
+    cfg.StrOpt('method', default='scrypt', help='werkzeug password hash method with its cost parameters, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000.'),
+    cfg.IntOpt('salt_length', default=16, help='Length of the generated password salt.'),
+    cfg.IntOpt('max_workers', default=2, help='Processes dedicated to password hashing; 0 hashes in the request thread.'),
+    cfg.IntOpt('max_queue', default=8, help='Hashing requests allowed to wait for a worker before answering 503.'),
+    cfg.FloatOpt('timeout', default=10.0, help='Seconds a request waits for its password hash.')
+]
+
+cache_opts = [
+    cfg.IntOpt('response_cache_size', default=512, help='Maximum number of read endpoint responses cached between data refreshes.'),
+    cfg.BoolOpt('shared_generation', default=False, help='Share the data generation through MongoDB so a refresh on one replica invalidates every replica.'),
+    cfg.FloatOpt('generation_poll_interval', default=1.0, help='Seconds between two reads of the shared data generation.')
+]
+
+response_opts = [
+    cfg.StrOpt('json_backend', default='auto', choices=['auto', 'orjson', 'stdlib'],
+               help='JSON library serializing API responses; auto uses orjson when it is installed.'),
+    cfg.IntOpt('compression_min_size', default=1024, help='Smallest response body in bytes that is compressed; -1 disables compression.'),
+    cfg.IntOpt('gzip_level', default=6, help='gzip compression level of API responses.'),
+    cfg.IntOpt('brotli_quality', default=5, help='Brotli quality of API responses, used when the brotli package is installed.')
+]
+
+history_opts = [
+    cfg.StrOpt('collection', default='price_history', help='Collection receiving the price points recorded by each refresh.'),
+    cfg.IntOpt('retention_days', default=30, help='Days price points are kept; 0 disables price history.'),
+    cfg.IntOpt('bucket_seconds', default=86400, help='Time span of the price points stored in one bucket document.'),
+    cfg.StrOpt('currency', default='usd', help='Currency of the recorded prices, market caps and volumes.'),
+    cfg.IntOpt('max_candles', default=5000, help='Largest number of candles a single history request may ask for.')
+]
+
+snapshot_opts = [
+    cfg.StrOpt('currency', default='usd', help='Currency of the prices, market caps and volumes in the ranking snapshot.'),
+    cfg.IntOpt('max_results', default=500, help='Largest number of coins a ranking request may return.')
+]
+
+search_opts = [
+    cfg.IntOpt('max_results', default=50, help='Largest number of coins a search request may return.'),
+    cfg.FloatOpt('fuzzy_threshold', default=0.5, help='Share of the query trigrams a coin must contain to be a fuzzy match.')
+]
+
+batch_opts = [
+    cfg.FloatOpt('window_ms', default=2.0, help='Milliseconds a coin lookup waits for concurrent lookups to join its batch.'),
+    cfg.IntOpt('max_batch', default=1000, help='Number of distinct coin ids that closes a lookup batch early.'),
+    cfg.IntOpt('max_ids', default=500, help='Largest number of coin ids a single lookup request may ask for.')
+]
+
+fx_opts = [
+    cfg.IntOpt('ttl', default=3600, help='Seconds exchange rates are served before they are fetched again.'),
+    cfg.IntOpt('refresh_interval', default=900, help='Seconds between background exchange rate fetches; 0 fetches on demand only.'),
+    cfg.FloatOpt('timeout', default=10.0, help='Seconds allowed for an exchange rates request.')
+]
+
+coingecko_opts = [
+    cfg.IntOpt('max_workers', default=8, help='Number of coins fetched concurrently during a data refresh.'),
+    cfg.FloatOpt('requests_per_minute', default=30, help='Steady request rate allowed against the CoinGecko API.'),
+    cfg.IntOpt('burst', default=5, help='Number of requests that may be sent back to back before throttling.'),
+    cfg.IntOpt('max_retries', default=5, help='Attempts per coin before it is reported as failed.'),
+    cfg.FloatOpt('backoff_base', default=1.0, help='Seconds of the first retry backoff, doubled on each attempt.'),
+    cfg.FloatOpt('backoff_max', default=60.0, help='Upper bound in seconds for a single retry backoff.'),
+    cfg.FloatOpt('retry_after_default', default=60.0, help='Seconds to pause on a 429 without a Retry-After header.'),
+    cfg.FloatOpt('request_timeout', default=30.0, help='Seconds allowed for a single CoinGecko request.')
 ]
 conf.register_opts(database_opts, group='database')
 conf.register_opts(token_opts, group='token')
+conf.register_opts(coingecko_opts, group='coingecko')
+conf.register_opts(refresh_opts, group='refresh')
+conf.register_opts(storage_opts, group='storage')
+conf.register_opts(password_opts, group='password')
+conf.register_opts(cache_opts, group='cache')
+conf.register_opts(response_opts, group='response')
+conf.register_opts(fx_opts, group='fx')
+conf.register_opts(history_opts, group='history')
+conf.register_opts(snapshot_opts, group='snapshot')
+conf.register_opts(search_opts, group='search')
+conf.register_opts(batch_opts, group='batch')
 
 
 def startup_sanity_checks():
@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import Callable
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class _Batch(object):
+    def __init__(self) -> None:
+        self.ids = set()
+        self.results = {}
+        self.error = None
+        self.done = threading.Event()
+
+
+class LookupCoalescer(object):
+    """Coalesces concurrent lookups by id into one fetch per micro-batch.
+
+    The first caller of a batch waits ``window`` seconds while later callers
+    add their ids, then fetches the union once and wakes every caller.
+    An id requested several times in a window is fetched once. A batch that
+    reaches ``max_batch`` ids is closed early so the next caller starts a
+    new one.
+    """
+
+    def __init__(self,
+                 fetch: Callable[[list[str]], dict[str, dict]],
+                 /,
+                 *,
+                 window: float = None,
+                 max_batch: int = None) -> None:
+        self.fetch = fetch
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = 0
+        self.batches = 0
+        self.ids_requested = 0
+        self.ids_fetched = 0
+        self.__batch = None
+        self.__lock = threading.Lock()
+
+    def get_many(self,
+                 ids: list[str]) -> dict[str, dict]:
+        """Documents of the found ``ids``, by id."""
+        window = self.window if self.window is not None else cfg.CONF.batch.window_ms / 1000
+        max_batch = self.max_batch or cfg.CONF.batch.max_batch
+        with self.__lock:
+            batch = self.__batch
+            leader = batch is None
+            if leader:
+                batch = self.__batch = _Batch()
+            batch.ids.update(ids)
+            if len(batch.ids) >= max_batch:
+                self.__batch = None
+            self.requests += 1
+            self.ids_requested += len(ids)
+
+        if not leader:
+            batch.done.wait()
+        else:
+            time.sleep(window)
+            with self.__lock:
+                if self.__batch is batch:
+                    self.__batch = None
+                self.batches += 1
+                self.ids_fetched += len(batch.ids)
+            try:
+                batch.results = self.fetch(sorted(batch.ids))
+            except Exception as e:
+                LOG.error(f"Batched lookup of {len(batch.ids)} ids failed: {e}")
+                batch.error = e
+            finally:
+                batch.done.set()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "ids_requested": self.ids_requested,
+                "ids_fetched": self.ids_fetched
+            }
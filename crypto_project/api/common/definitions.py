@@ -1,3 +1,9 @@
+from oslo_config import cfg
+from pymongo import ASCENDING
+from pymongo import DESCENDING
+from pymongo import IndexModel
+
+
 class Regex(object):
     email = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
     password = r'^(?=.*[A-Z])(?=.*[a-z])(?=.*[0-9])(?=.*[!@#$%^&*()_+=<>?/.,;:]).+$'
@@ -5,4 +11,38 @@ class Regex(object):
 
 class Urls(object):
     COINS_LIST_URL = "https://api.coingecko.com/api/v3/coins/list"
-    COIN_ID_URL = "https://api.coingecko.com/api/v3/coins/{}"
\ No newline at end of file
+    COIN_ID_URL = "https://api.coingecko.com/api/v3/coins/{}"
+    FX_RATES_URL = "https://api.exchangerate-api.com/v4/latest/USD"
+
+class JobStatus(object):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class Indexes(object):
+    @staticmethod
+    def registry() -> dict[str, list[IndexModel]]:
+        """Indexes backing the hot queries, by collection name."""
+        registry = {
+            cfg.CONF.database.collection_name: [
+                IndexModel([("coin_id", ASCENDING)], name="coin_id", unique=True),
+                # Multikey index over the categories array
+                IndexModel([("categories", ASCENDING)], name="categories"),
+            ],
+            "user": [
+                IndexModel([("username", ASCENDING)], name="username", unique=True),
+            ],
+            "refresh_jobs": [
+                IndexModel([("shard", ASCENDING), ("started_at", DESCENDING)], name="shard_started_at"),
+            ],
+        }
+        if cfg.CONF.history.retention_days > 0:
+            registry[cfg.CONF.history.collection] = [
+                IndexModel([("coin_id", ASCENDING), ("start", ASCENDING)], name="coin_id_start"),
+                IndexModel([("expire_at", ASCENDING)], name="expire_at", expireAfterSeconds=0),
+            ]
+        if cfg.CONF.storage.archive_collection:
+            registry[cfg.CONF.storage.archive_collection] = [
+                IndexModel([("coin_id", ASCENDING)], name="coin_id", unique=True),
+            ]
+        return registry
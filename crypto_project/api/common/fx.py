@@ -0,0 +1,153 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import requests
+from flask import request
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from crypto_project.api.common.definitions import Urls
+
+LOG = logging.getLogger(__name__)
+
+
+class FXRatesUnavailable(Exception):
+    pass
+
+
+class FXRateCache(object):
+    """Exchange rates from USD, fetched on first use and served for ``ttl``
+    seconds.
+
+    An optional background thread refetches them every ``refresh_interval``
+    seconds so requests never wait on the rates source. When a fetch fails,
+    the last known rates are kept and the fetch is retried after
+    ``RETRY_INTERVAL`` seconds. ``version`` identifies the current rates,
+    so responses priced with them can be cached per rates version.
+    """
+
+    RETRY_INTERVAL = 60
+
+    def __init__(self,
+                 /,
+                 *,
+                 url: str = None,
+                 ttl: float = 3600,
+                 refresh_interval: float = 0,
+                 timeout: float = 10.0) -> None:
+        self.url = url
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.__rates = None
+        self.__version = None
+        self.__next_fetch = 0.0
+        self.__fetch_lock = threading.Lock()
+        self.__timer = None
+        self.__stopped = threading.Event()
+
+    @classmethod
+    def from_config(cls) -> "FXRateCache":
+        return cls(ttl=cfg.CONF.fx.ttl,
+                   refresh_interval=cfg.CONF.fx.refresh_interval,
+                   timeout=cfg.CONF.fx.timeout)
+
+    def rates(self) -> dict[str, float]:
+        if time.monotonic() >= self.__next_fetch:
+            with self.__fetch_lock:
+                if time.monotonic() >= self.__next_fetch:
+                    self.refresh()
+        if self.__rates is None:
+            raise FXRatesUnavailable("Exchange rates are unavailable")
+        return self.__rates
+
+    def rate(self,
+             currency: str) -> float:
+        rate = self.rates().get(currency.upper())
+        if rate is None:
+            raise ValueError(f"Unsupported currency: {currency}")
+        return rate
+
+    def version(self) -> Optional[tuple[str, float]]:
+        """Digest of the current rates and the time they last changed, or
+        None before the first successful fetch. Replicas holding the same
+        rates share a digest."""
+        return self.__version
+
+    def refresh(self) -> bool:
+        """Fetch the rates; returns True when they changed."""
+        try:
+            response = requests.get(self.url or Urls.FX_RATES_URL, timeout=self.timeout)
+            response.raise_for_status()
+            rates = dict((currency.upper(), float(rate)) for currency, rate in response.json()["rates"].items())
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            LOG.warning(f"Exchange rates fetch failed, keeping the last known rates: {e}")
+            self.__next_fetch = time.monotonic() + min(self.ttl, self.RETRY_INTERVAL)
+            return False
+        previous, self.__rates = self.__rates, rates
+        self.__next_fetch = time.monotonic() + self.ttl
+        changed = rates != previous
+        if changed:
+            digest = hashlib.blake2b(json.dumps(rates, sort_keys=True).encode(), digest_size=8).hexdigest()
+            self.__version = (digest, time.time())
+        return changed
+
+    def start(self):
+        if self.refresh_interval <= 0 or (self.__timer is not None and self.__timer.is_alive()):
+            return
+        self.__stopped.clear()
+        self.__timer = threading.Thread(target=self.__run_periodically, name="fx-rates-refresh", daemon=True)
+        self.__timer.start()
+
+    def stop(self):
+        self.__stopped.set()
+
+    def __run_periodically(self):
+        while True:
+            with self.__fetch_lock:
+                self.refresh()
+            if self.__stopped.wait(self.refresh_interval):
+                return
+
+
+def convert_prices(coins: list[dict],
+                   rate: float,
+                   /,
+                   *,
+                   source: str,
+                   target: str) -> list[dict]:
+    """Replace the ``source`` price of every coin on a page by its ``target``
+    price, converted in one vectorized multiply. Missing prices stay None."""
+    prices = np.array([coin.pop(source, None) for coin in coins], dtype=np.float64) * rate
+    converted = np.where(np.isnan(prices), None, prices).tolist()
+    for coin, price in zip(coins, converted):
+        coin[target] = price
+    return coins
+
+
+_fx_rates = None
+_fx_rates_lock = threading.Lock()
+
+
+def get_fx_rates() -> FXRateCache:
+    global _fx_rates
+    if _fx_rates is None:
+        with _fx_rates_lock:
+            if _fx_rates is None:
+                _fx_rates = FXRateCache.from_config()
+    return _fx_rates
+
+
+def fx_cache_variant() -> Optional[tuple[str, float]]:
+    """Rates version of a request asking for prices in a currency other than
+    CAD, so its cached response changes with the rates and not with the
+    data generation."""
+    body = request.get_json(silent=True)
+    vs_currency = (body.get("vs_currency") if isinstance(body, dict) else None) or request.args.get("vs_currency")
+    if not vs_currency or str(vs_currency).lower() == "cad":
+        return None
+    return get_fx_rates().version() or ("none", 0.0)
@@ -0,0 +1,122 @@
+import multiprocessing
+import threading
+from concurrent.futures import CancelledError
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from oslo_config import cfg
+from werkzeug.security import check_password_hash
+from werkzeug.security import generate_password_hash
+
+
+class HashingUnavailable(Exception):
+    pass
+
+
+class HashingPoolSaturated(HashingUnavailable):
+    pass
+
+
+class PasswordHasher(object):
+    """Runs password hashing on a dedicated, size-limited process pool.
+
+    At most ``max_workers + max_queue`` hashes may be in flight; callers
+    beyond that get HashingPoolSaturated instead of queueing, so a login
+    burst cannot stall the request threads serving cheap reads. A slot is
+    held until its hash finishes, even when the caller timed out. A hash
+    that times out or hits a broken pool raises HashingUnavailable, and a
+    broken pool is replaced. With ``max_workers`` set to 0 hashing runs in
+    the calling thread.
+    """
+
+    def __init__(self,
+                 /,
+                 *,
+                 method: str,
+                 salt_length: int,
+                 max_workers: int,
+                 max_queue: int,
+                 timeout: float) -> None:
+        self.method = method
+        self.salt_length = salt_length
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.__slots = threading.BoundedSemaphore(max_workers + max_queue) if max_workers else None
+        self.__executor = None
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "PasswordHasher":
+        conf = cfg.CONF.password
+        return cls(method=conf.method,
+                   salt_length=conf.salt_length,
+                   max_workers=conf.max_workers,
+                   max_queue=conf.max_queue,
+                   timeout=conf.timeout)
+
+    def __run(self, func, *args):
+        if not self.max_workers:
+            return func(*args)
+        if not self.__slots.acquire(blocking=False):
+            raise HashingPoolSaturated("Password hashing pool is saturated")
+        executor = self.__get_executor()
+        try:
+            future = executor.submit(func, *args)
+        except BaseException as e:
+            self.__slots.release()
+            if isinstance(e, (BrokenProcessPool, RuntimeError)):
+                self.__discard(executor)
+                raise HashingUnavailable("Password hashing pool is unavailable") from e
+            raise
+        future.add_done_callback(lambda _: self.__slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError as e:
+            raise HashingUnavailable("Password hashing timed out") from e
+        except (BrokenProcessPool, CancelledError) as e:
+            self.__discard(executor)
+            raise HashingUnavailable("Password hashing pool is unavailable") from e
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        if self.__executor is None:
+            with self.__lock:
+                if self.__executor is None:
+                    # spawn: forking a threaded web server is unsafe
+                    self.__executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                          mp_context=multiprocessing.get_context("spawn"))
+        return self.__executor
+
+    def __discard(self, executor: ProcessPoolExecutor):
+        """Replace a broken pool; its pending hashes are cancelled, freeing their slots."""
+        with self.__lock:
+            if self.__executor is executor:
+                self.__executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def hash(self,
+             password: str) -> str:
+        return self.__run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self,
+               pwhash: str,
+               password: str) -> bool:
+        return self.__run(check_password_hash, pwhash, password)
+
+    def shutdown(self):
+        if self.__executor is not None:
+            self.__executor.shutdown(cancel_futures=True)
+            self.__executor = None
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher.from_config()
+    return _hasher
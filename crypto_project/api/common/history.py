@@ -0,0 +1,135 @@
+import datetime
+from typing import Optional
+
+from oslo_config import cfg
+
+from common.mongo_adapter import BulkWriter
+from common.mongo_adapter import DatabaseAdapter
+
+
+class PriceHistory(object):
+    """Price points appended by each refresh, bucketed per coin.
+
+    One document holds the points of a coin within ``bucket_seconds``. A
+    point keeps the time ``t`` in epoch seconds, the price ``p``, the
+    market cap ``m`` and the 24h volume ``v``, all in ``currency``. A TTL
+    index on ``expire_at`` drops a bucket once all of its points are older
+    than the retention. ``runs`` lists the refresh jobs that wrote to a
+    bucket, so a resumed job can skip coins it already recorded.
+    """
+
+    def __init__(self,
+                 /,
+                 *,
+                 collection: str = "price_history",
+                 bucket_seconds: int = 86400,
+                 retention_days: int = 30,
+                 currency: str = "usd") -> None:
+        self.bucket_seconds = bucket_seconds
+        self.retention = datetime.timedelta(days=retention_days)
+        self.currency = currency
+        self.db = DatabaseAdapter()
+        self.db.set_collection_name(collection)
+
+    @classmethod
+    def from_config(cls) -> "PriceHistory":
+        return cls(collection=cfg.CONF.history.collection,
+                   bucket_seconds=cfg.CONF.history.bucket_seconds,
+                   retention_days=cfg.CONF.history.retention_days,
+                   currency=cfg.CONF.history.currency)
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention > datetime.timedelta(0)
+
+    def writer(self) -> BulkWriter:
+        return self.db.bulk_writer()
+
+    def point(self,
+              coin_data: dict,
+              recorded_at: int) -> Optional[dict]:
+        """Compact price point of a fetched coin, or None when it has no price."""
+        market_data = coin_data.get("market_data") or {}
+        price = (market_data.get("current_price") or {}).get(self.currency)
+        if price is None:
+            return None
+        return {
+            "t": recorded_at,
+            "p": price,
+            "m": (market_data.get("market_cap") or {}).get(self.currency),
+            "v": (market_data.get("total_volume") or {}).get(self.currency)
+        }
+
+    def record(self,
+               writer: BulkWriter,
+               coin_id: str,
+               coin_data: dict,
+               recorded_at: int,
+               /,
+               *,
+               run=None):
+        """Append the point of a coin fetched at ``recorded_at`` by refresh job ``run``."""
+        point = self.point(coin_data, recorded_at)
+        if point is None:
+            return
+        start = recorded_at - recorded_at % self.bucket_seconds
+        expire_at = (datetime.datetime.fromtimestamp(start + self.bucket_seconds, tz=datetime.timezone.utc) +
+                     self.retention)
+        update = {"$push": {"points": point},
+                  "$setOnInsert": {"coin_id": coin_id, "start": start, "expire_at": expire_at}}
+        if run is not None:
+            update["$addToSet"] = {"runs": run}
+        writer.upsert({"_id": f"{coin_id}:{start}"}, update)
+
+    def recorded_coins(self,
+                       run) -> set[str]:
+        """Coins that refresh job ``run`` already recorded a point for."""
+        return set(document["coin_id"] for document in self.db.find_documents(
+            {"runs": run}, include_fields=["coin_id"], exclude_fields=["_id"]))
+
+    def __range_stages(self,
+                       coin_id: str,
+                       start: int,
+                       end: int) -> list[dict]:
+        # Buckets are pruned on the (coin_id, start) index before their points are unwound
+        return [
+            {"$match": {"coin_id": coin_id, "start": {"$gt": start - self.bucket_seconds, "$lt": end}}},
+            {"$unwind": "$points"},
+            {"$match": {"points.t": {"$gte": start, "$lt": end}}},
+            {"$sort": {"points.t": 1}}
+        ]
+
+    def points(self,
+               coin_id: str,
+               start: int,
+               end: int) -> list[dict]:
+        """Every point of a coin in ``[start, end)``, oldest first."""
+        pipeline = self.__range_stages(coin_id, start, end) + [
+            {"$project": {"_id": 0, "t": "$points.t", "price": "$points.p",
+                          "market_cap": "$points.m", "volume": "$points.v"}}
+        ]
+        return list(self.db.aggregate(pipeline))
+
+    def candles(self,
+                coin_id: str,
+                start: int,
+                end: int,
+                interval: int) -> list[dict]:
+        """OHLC candles of ``interval`` seconds over ``[start, end)``, grouped
+        on the server. Empty intervals are left out."""
+        pipeline = self.__range_stages(coin_id, start, end) + [
+            {"$group": {"_id": {"$subtract": ["$points.t", {"$mod": ["$points.t", interval]}]},
+                        "open": {"$first": "$points.p"},
+                        "high": {"$max": "$points.p"},
+                        "low": {"$min": "$points.p"},
+                        "close": {"$last": "$points.p"},
+                        "volume": {"$last": "$points.v"},
+                        "points": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+            {"$project": {"_id": 0, "t": "$_id", "open": 1, "high": 1, "low": 1, "close": 1,
+                          "volume": 1, "points": 1}}
+        ]
+        candles = list(self.db.aggregate(pipeline))
+        for candle in candles:
+            candle["t"] = int(candle["t"])
+        return candles
@@ -0,0 +1,192 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+
+import requests
+from oslo_config import cfg
+from oslo_log import log as logging
+from requests.adapters import HTTPAdapter
+
+from crypto_project.api.common.definitions import Urls
+
+LOG = logging.getLogger(__name__)
+
+
+class CoinGeckoError(Exception):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate adapts to 429 responses.
+
+    A rate-limit response halves the refill rate and pauses every caller
+    until the Retry-After deadline; each successful request then restores a
+    small share of the configured rate.
+    """
+
+    def __init__(self,
+                 rate: float,
+                 capacity: int,
+                 /,
+                 *,
+                 min_rate: float = None) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.blocked_until = 0.0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait_for)
+
+    def penalize(self, retry_after: float):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+
+    def reward(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class IngestionEngine:
+    """Fetches CoinGecko coin details on a bounded thread pool that shares one
+    keep-alive session and one rate limiter."""
+
+    def __init__(self,
+                 /,
+                 *,
+                 coins_list_url: str = None,
+                 coin_id_url: str = None,
+                 max_workers: int = None,
+                 requests_per_minute: float = None,
+                 burst: int = None,
+                 max_retries: int = None) -> None:
+        conf = cfg.CONF.coingecko
+        self.coins_list_url = coins_list_url or Urls.COINS_LIST_URL
+        self.coin_id_url = coin_id_url or Urls.COIN_ID_URL
+        self.max_workers = max_workers or conf.max_workers
+        self.max_retries = max_retries or conf.max_retries
+        self.backoff_base = conf.backoff_base
+        self.backoff_max = conf.backoff_max
+        self.retry_after_default = conf.retry_after_default
+        self.timeout = conf.request_timeout
+        self.bucket = TokenBucket((requests_per_minute or conf.requests_per_minute) / 60,
+                                  burst or conf.burst)
+        self.session = requests.Session()
+        self.session.headers.update({"accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _retry_after(self, response: requests.Response) -> float:
+        value = response.headers.get("Retry-After")
+        try:
+            return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            return self.retry_after_default
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying workers from hitting the API in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _get(self, url: str) -> Optional[requests.Response]:
+        for attempt in range(self.max_retries):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                LOG.warning(f"Request to {url} failed: {e}")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                LOG.warning(f"Rate limit hit for {url}. Retrying in {retry_after}s")
+                self.bucket.penalize(retry_after)
+                time.sleep(self._backoff(attempt))
+                continue
+            if response.status_code >= 500:
+                LOG.warning(f"{url} returned {response.status_code}. Retrying...")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            self.bucket.reward()
+            return response
+        raise CoinGeckoError(f"Giving up on {url} after {self.max_retries} attempts")
+
+    def fetch_coins_list(self) -> list[dict]:
+        response = self._get(self.coins_list_url)
+        if response.status_code != 200:
+            raise CoinGeckoError(f"Coins list API failed with status {response.status_code}")
+        return response.json()
+
+    def fetch_coin(self, coin_id: str) -> Optional[dict]:
+        response = self._get(self.coin_id_url.format(coin_id))
+        if response.status_code != 200:
+            LOG.warning(f"Coin {coin_id} returned status {response.status_code}, skipping")
+            return None
+        return response.json()
+
+    def fetch_coins(self,
+                    coin_ids: Iterable[str]) -> Iterator[tuple[str, Optional[dict], Optional[Exception]]]:
+        """Yield ``(coin_id, data, error)`` as each coin completes.
+
+        At most ``2 * max_workers`` fetches are queued at once, so results
+        can be streamed into the database without holding the universe in
+        memory.
+        """
+        coin_ids = iter(coin_ids)
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="coingecko") as executor:
+            pending = {}
+
+            def submit_next() -> bool:
+                coin_id = next(coin_ids, None)
+                if coin_id is None:
+                    return False
+                pending[executor.submit(self.fetch_coin, coin_id)] = coin_id
+                return True
+
+            while len(pending) < 2 * self.max_workers and submit_next():
+                pass
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    coin_id = pending.pop(future)
+                    error = future.exception()
+                    yield coin_id, None if error else future.result(), error
+                    submit_next()
@@ -0,0 +1,154 @@
+import datetime
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from typing import Iterable
+from typing import Optional
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from pymongo.errors import DuplicateKeyError
+
+from common.mongo_adapter import DatabaseAdapter
+
+LOG = logging.getLogger(__name__)
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def shard_of(coin_id: str,
+             shard_count: int) -> int:
+    """Stable shard number of a coin, independent of the coin list order."""
+    return zlib.crc32(coin_id.encode()) % shard_count
+
+
+def lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class ShardLease(object):
+    """A TTL lease on one refresh shard, stored in ``refresh_leases``.
+
+    A shard can be claimed when its lease has expired and it was not
+    completed within the last ``shard_min_age`` seconds. While the lease is
+    held as a context manager, a heartbeat thread renews it every third of
+    its TTL, so it outlives stalls in the work itself; if the replica
+    crashes, the lease expires and another replica claims the shard and
+    resumes its refresh job.
+    """
+
+    COLLECTION = "refresh_leases"
+
+    def __init__(self,
+                 shard: int,
+                 shard_count: int,
+                 owner: str,
+                 /) -> None:
+        self.shard = shard
+        self.shard_count = shard_count
+        self.owner = owner
+        self.ttl = cfg.CONF.refresh.lease_ttl
+        self.renewed_at = time.monotonic()
+        self.lost = False
+        self.db = DatabaseAdapter()
+        self.db.set_collection_name(self.COLLECTION)
+        self.__released = threading.Event()
+        self.__heartbeat = None
+
+    @classmethod
+    def claim(cls,
+              shard_count: int,
+              /,
+              *,
+              owner: str = None,
+              exclude: Iterable[int] = ()) -> Optional["ShardLease"]:
+        """Claim the first free shard not in ``exclude``, or return None when
+        all are taken."""
+        owner = owner or lease_owner()
+        db = DatabaseAdapter()
+        db.set_collection_name(cls.COLLECTION)
+        now = datetime.datetime.utcnow()
+        completed_before = now - datetime.timedelta(seconds=cfg.CONF.refresh.shard_min_age)
+        # Start at a different shard per owner so replicas rarely race for the same one
+        offset = zlib.crc32(owner.encode()) % shard_count
+        exclude = set(exclude)
+        for index in range(shard_count):
+            shard = (offset + index) % shard_count
+            if shard in exclude:
+                continue
+            query = {
+                "_id": shard,
+                "$and": [
+                    {"expires_at": {"$lte": now}},
+                    {"$or": [{"completed_at": None}, {"completed_at": {"$lt": completed_before}}]}
+                ]
+            }
+            update = {"$set": {"owner": owner,
+                               "claimed_at": now,
+                               "expires_at": now + datetime.timedelta(seconds=cfg.CONF.refresh.lease_ttl)}}
+            try:
+                # The upsert creates missing shard documents; an existing,
+                # unclaimable shard fails the insert on its _id instead.
+                result = db.update_document(query, update, upsert=True)
+                if result.matched_count or result.upserted_id is not None:
+                    LOG.info(f"{owner} claimed refresh shard {shard}/{shard_count}")
+                    return cls(shard, shard_count, owner)
+            except DuplicateKeyError:
+                continue
+        return None
+
+    def coin_ids(self,
+                 coin_ids: list[str]) -> list[str]:
+        return [coin_id for coin_id in coin_ids if shard_of(coin_id, self.shard_count) == self.shard]
+
+    def renew(self):
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.ttl)
+        result = self.db.update_document({"_id": self.shard, "owner": self.owner},
+                                         {"$set": {"expires_at": expires_at}},
+                                         upsert=False)
+        if not result.matched_count:
+            raise LeaseLost(f"Lease on refresh shard {self.shard} was taken over")
+        self.renewed_at = time.monotonic()
+
+    def ensure_held(self):
+        """Raise LeaseLost once the heartbeat found the lease taken over."""
+        if self.lost:
+            raise LeaseLost(f"Lease on refresh shard {self.shard} was taken over")
+
+    def __renew_periodically(self):
+        while not self.__released.wait(self.ttl / 3):
+            try:
+                self.renew()
+            except LeaseLost as e:
+                LOG.warning(str(e))
+                self.lost = True
+                return
+            except Exception as e:
+                LOG.warning(f"Renewing the lease on refresh shard {self.shard} failed: {e}")
+
+    def release(self,
+                /,
+                *,
+                completed: bool):
+        now = datetime.datetime.utcnow()
+        fields = {"owner": None, "expires_at": now}
+        if completed:
+            fields["completed_at"] = now
+        self.db.update_document({"_id": self.shard, "owner": self.owner}, {"$set": fields}, upsert=False)
+
+    def __enter__(self):
+        self.__released.clear()
+        self.__heartbeat = threading.Thread(target=self.__renew_periodically,
+                                            name=f"refresh-lease-{self.shard}", daemon=True)
+        self.__heartbeat.start()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.__released.set()
+        self.__heartbeat.join()
+        self.release(completed=exc_type is None and not self.lost)
@@ -0,0 +1,364 @@
+import datetime
+import hashlib
+import json
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Optional
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from common.mongo_adapter import BulkWriter
+from common.mongo_adapter import DatabaseAdapter
+from crypto_project.api.common.definitions import JobStatus
+
+LOG = logging.getLogger(__name__)
+
+
+def fingerprint(value: Any) -> str:
+    """Stable digest of a JSON-compatible value, independent of key order."""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def field_fingerprints(document: dict) -> dict[str, str]:
+    return dict((field, fingerprint(value)) for field, value in document.items())
+
+
+class RefreshStats(object):
+    def __init__(self,
+                 /,
+                 *,
+                 refreshed: int = 0,
+                 unchanged: int = 0,
+                 failed: int = 0,
+                 bytes_received: int = 0,
+                 bytes_stored: int = 0,
+                 errors: list[dict] = None) -> None:
+        self.refreshed = refreshed
+        self.unchanged = unchanged
+        self.failed = failed
+        self.bytes_received = bytes_received
+        self.bytes_stored = bytes_stored
+        self.errors = errors or []
+
+    def add(self,
+            other: "RefreshStats"):
+        self.refreshed += other.refreshed
+        self.unchanged += other.unchanged
+        self.failed += other.failed
+        self.bytes_received += other.bytes_received
+        self.bytes_stored += other.bytes_stored
+        self.errors.extend(other.errors)
+
+    def to_dict(self) -> dict:
+        return {
+            "refreshed": self.refreshed,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "bytes_received": self.bytes_received,
+            "bytes_stored": self.bytes_stored,
+            "bytes_saved": self.bytes_received - self.bytes_stored
+        }
+
+
+class ChangeDetector(object):
+    """Turns fetched coins into minimal upserts.
+
+    Incoming coins are buffered and compared, one ``$in`` lookup per batch,
+    against the fingerprints stored with each coin. Unchanged coins are
+    skipped; changed coins only ``$set`` the top-level fields whose
+    fingerprint differs and ``$unset`` every other stored field, including
+    those of documents written before fingerprints or the hot schema.
+    Like BulkWriter, a batch is compared and written once ``batch_size``
+    coins are buffered or the oldest one is ``flush_interval`` seconds old.
+    """
+
+    BOOKKEEPING_FIELDS = ("_id", "coin_id", "fingerprint", "field_fingerprints")
+
+    def __init__(self,
+                 db: DatabaseAdapter,
+                 writer: BulkWriter,
+                 /,
+                 *,
+                 batch_size: int = None,
+                 flush_interval: float = None,
+                 stats: RefreshStats = None) -> None:
+        self.db = db
+        self.writer = writer
+        self.batch_size = batch_size or cfg.CONF.database.bulk_batch_size
+        self.flush_interval = (flush_interval if flush_interval is not None
+                               else cfg.CONF.database.bulk_flush_interval)
+        self.stats = stats or RefreshStats()
+        self.__pending = []
+        self.__first_pending_at = None
+        self.__synced_batches = 0
+
+    def add(self,
+            coin_id: str,
+            coin_data: dict):
+        if not self.__pending:
+            self.__first_pending_at = time.monotonic()
+        self.__pending.append((coin_id, coin_data))
+        if len(self.__pending) >= self.batch_size:
+            self.flush()
+        elif time.monotonic() - self.__first_pending_at >= self.flush_interval:
+            # Slowly arriving coins must not wait for a full batch to reach Mongo
+            self.flush()
+            self.writer.flush()
+
+    def fail(self,
+             coin_id: str,
+             error: Exception):
+        self.stats.failed += 1
+        self.stats.errors.append({"coin_id": coin_id, "error": str(error)})
+        del self.stats.errors[:-cfg.CONF.refresh.max_recorded_errors]
+
+    def flush(self):
+        pending, self.__pending = self.__pending, []
+        if not pending:
+            return
+
+        stored = dict((doc["coin_id"], doc) for doc in self.db.aggregate([
+            {"$match": {"coin_id": {"$in": [coin_id for coin_id, _ in pending]}}},
+            # The stored field names, so documents written without fingerprints also shed dropped fields
+            {"$project": {"_id": 0, "coin_id": 1, "fingerprint": 1, "field_fingerprints": 1,
+                          "fields": {"$map": {"input": {"$objectToArray": "$$ROOT"}, "in": "$$this.k"}}}}
+        ]))
+
+        for coin_id, coin_data in pending:
+            hashes = field_fingerprints(coin_data)
+            digest = fingerprint(hashes)
+            previous = stored.get(coin_id, {})
+            if previous.get("fingerprint") == digest:
+                self.stats.unchanged += 1
+                continue
+
+            previous_hashes = previous.get("field_fingerprints", {})
+            changed = dict((field, coin_data[field]) for field, value_hash in hashes.items()
+                           if previous_hashes.get(field) != value_hash)
+            changed.update({"fingerprint": digest, "field_fingerprints": hashes})
+            update = {"$set": changed}
+            removed = [field for field in previous.get("fields", ())
+                       if field not in hashes and field not in self.BOOKKEEPING_FIELDS]
+            if removed:
+                update["$unset"] = dict.fromkeys(removed, "")
+            self.writer.upsert({"coin_id": coin_id}, update)
+
+    def sync(self) -> RefreshStats:
+        """Write everything buffered so far and fold the write results into
+        the stats; after this every added coin is durable."""
+        self.flush()
+        self.writer.flush()
+        for batch in self.writer.batches[self.__synced_batches:]:
+            self.stats.refreshed += batch.succeeded
+            self.stats.failed += batch.failed
+        self.__synced_batches = len(self.writer.batches)
+        return self.stats
+
+    close = sync
+
+
+class RefreshJob(object):
+    """A data refresh run persisted in the ``refresh_jobs`` collection.
+
+    Coin ids are processed in sorted order and the job's ``cursor`` is the
+    last id below which every coin has been written, so a run interrupted
+    by a crash or redeploy resumes after the cursor instead of starting
+    over.
+    """
+
+    COLLECTION = "refresh_jobs"
+
+    def __init__(self,
+                 document: dict,
+                 coin_ids: list[str],
+                 /) -> None:
+        self.db = DatabaseAdapter()
+        self.db.set_collection_name(self.COLLECTION)
+        self.document = document
+        # A job document that already exists is resumed after an interrupted run
+        self.resumed = "_id" in document
+        cursor = document.get("cursor")
+        self.pending_ids = [coin_id for coin_id in coin_ids if cursor is None or coin_id > cursor]
+        self.__positions = dict((coin_id, index) for index, coin_id in enumerate(self.pending_ids))
+        self.__done = [False] * len(self.pending_ids)
+        self.__watermark = -1
+        self.__since_checkpoint = 0
+        self.__processed_before_run = document.get("processed", 0)
+
+    @property
+    def id(self):
+        return self.document["_id"]
+
+    @property
+    def stats(self) -> RefreshStats:
+        return RefreshStats(refreshed=self.document.get("refreshed", 0),
+                            unchanged=self.document.get("unchanged", 0),
+                            failed=self.document.get("failed", 0),
+                            bytes_received=self.document.get("bytes_received", 0),
+                            bytes_stored=self.document.get("bytes_stored", 0),
+                            errors=list(self.document.get("errors", [])))
+
+    @classmethod
+    def latest(cls,
+               query: dict = None) -> Optional[dict]:
+        db = DatabaseAdapter()
+        db.set_collection_name(cls.COLLECTION)
+        documents = list(db.find_documents(query or {}, sort=[("started_at", -1)], limit=1))
+        return documents[0] if documents else None
+
+    @classmethod
+    def start(cls,
+              coin_ids: list[str],
+              /,
+              *,
+              shard: int = None) -> "RefreshJob":
+        """Resume the latest unfinished job of ``shard``, or start a new one."""
+        coin_ids = sorted(set(coin_ids))
+        now = datetime.datetime.utcnow()
+        document = cls.latest({"status": {"$ne": JobStatus.COMPLETED}, "shard": shard})
+        if document:
+            LOG.info(f"Resuming data refresh {document['_id']} after {document.get('cursor')}")
+        else:
+            document = {
+                "shard": shard,
+                "status": JobStatus.RUNNING,
+                "started_at": now,
+                "cursor": None,
+                "processed": 0,
+                "refreshed": 0,
+                "unchanged": 0,
+                "failed": 0,
+                "bytes_received": 0,
+                "bytes_stored": 0,
+                "errors": []
+            }
+        document.update({"status": JobStatus.RUNNING,
+                         "total": len(coin_ids),
+                         "run_started_at": now,
+                         "run_processed": 0,
+                         "updated_at": now,
+                         "finished_at": None})
+        job = cls(document, coin_ids)
+        if "_id" in document:
+            job.save()
+        else:
+            document["_id"] = job.db.insert_document(document).inserted_id
+        return job
+
+    def save(self):
+        fields = dict((key, value) for key, value in self.document.items() if key != "_id")
+        self.db.update_document({"_id": self.id}, {"$set": fields}, upsert=False)
+
+    def mark_done(self,
+                  coin_id: str) -> bool:
+        """Record a processed coin; returns True when a checkpoint is due."""
+        self.__done[self.__positions[coin_id]] = True
+        while self.__watermark + 1 < len(self.__done) and self.__done[self.__watermark + 1]:
+            self.__watermark += 1
+        self.__since_checkpoint += 1
+        return self.__since_checkpoint >= cfg.CONF.refresh.checkpoint_interval
+
+    def checkpoint(self,
+                   stats: RefreshStats,
+                   /,
+                   *,
+                   status: str = JobStatus.RUNNING):
+        """Persist progress; ``stats`` must already be synced to the database."""
+        self.__since_checkpoint = 0
+        if self.__watermark >= 0:
+            self.document["cursor"] = self.pending_ids[self.__watermark]
+        self.document.update(stats.to_dict())
+        self.document.update({"status": status,
+                              "errors": stats.errors,
+                              "processed": self.__processed_before_run + self.__watermark + 1,
+                              "run_processed": self.__watermark + 1,
+                              "updated_at": datetime.datetime.utcnow()})
+        if status != JobStatus.RUNNING:
+            self.document["finished_at"] = self.document["updated_at"]
+        self.save()
+
+    def fail(self):
+        """Mark the job failed, keeping the cursor of the last checkpoint so
+        the next run resumes from there."""
+        now = datetime.datetime.utcnow()
+        self.document.update({"status": JobStatus.FAILED, "updated_at": now, "finished_at": now})
+        self.db.update_document({"_id": self.id},
+                                {"$set": {"status": JobStatus.FAILED, "updated_at": now, "finished_at": now}},
+                                upsert=False)
+
+    @staticmethod
+    def progress(document: dict) -> dict:
+        """Summarise a job document with throughput and ETA for the run."""
+        end = document.get("finished_at") or datetime.datetime.utcnow()
+        elapsed = (end - document["run_started_at"]).total_seconds()
+        throughput = document.get("run_processed", 0) / elapsed if elapsed > 0 else 0.0
+        remaining = document.get("total", 0) - document.get("processed", 0)
+        eta = remaining / throughput if throughput and document["status"] == JobStatus.RUNNING else None
+        progress = dict((key, value) for key, value in document.items() if key != "_id")
+        for key in ("started_at", "run_started_at", "updated_at", "finished_at"):
+            if progress.get(key):
+                progress[key] = progress[key].isoformat()
+        progress.update({"job_id": str(document["_id"]),
+                         "coins_per_sec": round(throughput, 3),
+                         "eta_seconds": round(eta, 1) if eta is not None else None})
+        return progress
+
+
+class RefreshScheduler(object):
+    """Single-flight runner for data refreshes with an optional periodic timer.
+
+    ``trigger`` starts ``refresh`` on a background thread unless a run is
+    already in progress, in which case the caller joins that run.
+    """
+
+    def __init__(self,
+                 refresh: Callable[[], Any],
+                 /) -> None:
+        self.refresh = refresh
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__timer = None
+        self.__stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def trigger(self) -> bool:
+        """Start a refresh; returns False if one was already running."""
+        with self.__lock:
+            if self.running:
+                return False
+            self.__thread = threading.Thread(target=self.refresh, name="data-refresh", daemon=True)
+            self.__thread.start()
+            return True
+
+    def wait(self,
+             timeout: float = None) -> bool:
+        thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.running
+
+    def start(self,
+              interval: float):
+        if interval <= 0 or (self.__timer is not None and self.__timer.is_alive()):
+            return
+        self.__stopped.clear()
+        self.__timer = threading.Thread(target=self.__run_periodically, args=(interval,),
+                                        name="data-refresh-scheduler", daemon=True)
+        self.__timer.start()
+        LOG.info(f"Data refresh scheduled every {interval} seconds")
+
+    def stop(self):
+        self.__stopped.set()
+
+    def __run_periodically(self,
+                           interval: float):
+        while not self.__stopped.wait(interval):
+            if not self.trigger():
+                LOG.info("Scheduled data refresh skipped, previous run still in progress")
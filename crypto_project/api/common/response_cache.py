@@ -0,0 +1,237 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+import uuid
+from typing import Callable
+from typing import Optional
+
+from cachetools import LRUCache
+from flask import current_app
+from flask import request
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from common.mongo_adapter import DatabaseAdapter
+from crypto_project.api.common.serialization import negotiate_encoding
+from crypto_project.api.common.utils import RestResponses
+
+LOG = logging.getLogger(__name__)
+
+
+class LocalGeneration(object):
+    """Data generation of this process, bumped after each of its refreshes."""
+
+    def __init__(self) -> None:
+        self.__epoch = uuid.uuid4().hex[:8]
+        self.__value = 0
+        self.__changed_at = time.time()
+        self.__lock = threading.Lock()
+
+    def current(self) -> tuple[str, float]:
+        """The generation token and the time it started."""
+        with self.__lock:
+            return f"{self.__epoch}.{self.__value}", self.__changed_at
+
+    def bump(self):
+        with self.__lock:
+            self.__value += 1
+            self.__changed_at = time.time()
+
+
+class SharedGeneration(object):
+    """Data generation stored in ``cache_generations``.
+
+    A refresh that finishes on any replica invalidates the caches of all
+    replicas. Mongo is read at most once per ``poll_interval`` seconds.
+    """
+
+    COLLECTION = "cache_generations"
+
+    def __init__(self,
+                 name: str = "coins",
+                 /,
+                 *,
+                 poll_interval: float = 1.0) -> None:
+        self.name = name
+        self.poll_interval = poll_interval
+        self.__current = None
+        self.__read_at = 0.0
+        self.__lock = threading.Lock()
+        self.db = DatabaseAdapter()
+        self.db.set_collection_name(self.COLLECTION)
+
+    def current(self) -> tuple[str, float]:
+        with self.__lock:
+            if self.__current is None or time.monotonic() - self.__read_at >= self.poll_interval:
+                document = self.db.find_document({"_id": self.name}) or {}
+                self.__current = (str(document.get("generation", 0)), document.get("changed_at", 0.0))
+                self.__read_at = time.monotonic()
+            return self.__current
+
+    def bump(self):
+        self.db.update_document({"_id": self.name},
+                                {"$inc": {"generation": 1}, "$set": {"changed_at": time.time()}},
+                                True)
+        with self.__lock:
+            self.__current = None
+
+
+class ResponseCache(object):
+    """LRU of serialized responses, keyed by data generation, route and
+    normalized arguments.
+
+    Entries of an older generation can never match again. The cache drops
+    them as soon as it sees a new generation.
+    """
+
+    def __init__(self,
+                 maxsize: int,
+                 /,
+                 *,
+                 generation=None) -> None:
+        self.generation = generation or LocalGeneration()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.__cache = LRUCache(maxsize)
+        self.__seen_generation = None
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def request_key() -> tuple:
+        """Route, normalized query arguments and JSON body, and negotiated
+        content coding of the current request."""
+        body = request.get_json(silent=True)
+        body = json.dumps(body, sort_keys=True, default=str) if body is not None else request.get_data()
+        return request.path, tuple(sorted(request.args.items(multi=True))), body, negotiate_encoding()
+
+    def get(self,
+            key: tuple) -> Optional[tuple]:
+        token = key[0]
+        with self.__lock:
+            if token != self.__seen_generation:
+                self.__cache.clear()
+                self.__seen_generation = token
+            entry = self.__cache.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self,
+            key: tuple,
+            entry: tuple):
+        with self.__lock:
+            if key[0] == self.__seen_generation:
+                self.__cache[key] = entry
+
+    def record_not_modified(self):
+        with self.__lock:
+            self.not_modified += 1
+
+    def invalidate(self):
+        self.generation.bump()
+        with self.__lock:
+            self.__cache.clear()
+
+    def clear(self):
+        with self.__lock:
+            self.__cache.clear()
+            self.hits = 0
+            self.misses = 0
+            self.not_modified = 0
+
+    def stats(self) -> dict:
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self.__cache),
+                "maxsize": self.__cache.maxsize,
+                "generation": self.__seen_generation
+            }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                generation = None
+                if cfg.CONF.cache.shared_generation:
+                    generation = SharedGeneration(poll_interval=cfg.CONF.cache.generation_poll_interval)
+                _response_cache = ResponseCache(cfg.CONF.cache.response_cache_size, generation=generation)
+    return _response_cache
+
+
+def etag_for(key: tuple) -> str:
+    """Strong entity tag of a cached response key, which starts with the data generation."""
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+def is_not_modified(etag: str,
+                    last_modified: float) -> bool:
+    """Whether the conditional headers of the current request match the
+    representation identified by ``etag`` and ``last_modified``."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def cached_response(func=None,
+                    /,
+                    *,
+                    variant: Callable[[], Optional[tuple[str, float]]] = None,
+                    cacheable: Callable[[], bool] = None):
+    """Serve successful responses of a read endpoint from the response cache
+    until the next data refresh.
+
+    ETag and Last-Modified come from the data generation, so a matching
+    conditional GET gets a 304 before the view runs. ``variant`` may return
+    a token and change time of other data the response depends on; both are
+    folded into the key and the validators. Requests for which
+    ``cacheable`` returns False bypass the cache.
+    """
+    if func is None:
+        return functools.partial(cached_response, variant=variant, cacheable=cacheable)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if cacheable is not None and not cacheable():
+            return func(*args, **kwargs)
+        cache = get_response_cache()
+        token, changed_at = cache.generation.current()
+        key = (token,) + cache.request_key()
+        version = variant() if variant else None
+        if version is not None:
+            key += (version[0],)
+            changed_at = max(changed_at, version[1])
+        etag = etag_for(key)
+        # A 304 is only defined for GET and HEAD
+        if request.method in ("GET", "HEAD") and is_not_modified(etag, changed_at):
+            cache.record_not_modified()
+            return RestResponses.not_modified(etag=etag, last_modified=changed_at)
+
+        entry = cache.get(key)
+        if entry is not None:
+            status, body, headers = entry
+            return current_app.response_class(body, status=status, headers=headers)
+
+        response = func(*args, **kwargs)
+        if response.status_code == 200:
+            RestResponses.add_validators(response, etag=etag, last_modified=changed_at)
+            cache.put(key, (response.status_code, response.get_data(), list(response.headers)))
+        return response
+    return wrapper
@@ -0,0 +1,222 @@
+import bisect
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Iterable
+from typing import Optional
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from common.mongo_adapter import DatabaseAdapter
+from crypto_project.api.common.response_cache import get_response_cache
+
+LOG = logging.getLogger(__name__)
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class SearchIndex(object):
+    """In-memory prefix and fuzzy index over coin ``name``, ``symbol`` and
+    ``coin_id``.
+
+    Every lowercased field, and every word of the name, is a term in one
+    sorted list, so a prefix is a bisect plus a short scan. Prefixes of up
+    to ``SHORT_PREFIX`` characters would match too many terms to scan.
+    They keep their coins pre-ranked by market cap rank instead. Trigrams
+    back typo-tolerant matching. ``upsert`` keeps every structure current
+    one coin at a time.
+    """
+
+    SHORT_PREFIX = 2
+
+    def __init__(self,
+                 documents: Iterable[dict] = (),
+                 /,
+                 *,
+                 generation: str = None) -> None:
+        self.generation = generation
+        self.__coins = {}
+        self.__terms = []
+        self.__short = {}
+        self.__exact = {}
+        self.__grams = {}
+        self.__lock = threading.Lock()
+        # A full build appends everything and sorts once instead of inserting in order
+        for document in documents:
+            coin_id = document.get("coin_id") or document.get("id")
+            self.__coins[coin_id] = self.entry(document)
+            self.__index(coin_id, self.__coins[coin_id], insert=list.append)
+        self.__terms.sort()
+        for coins in self.__short.values():
+            coins.sort()
+
+    def __len__(self) -> int:
+        return len(self.__coins)
+
+    @staticmethod
+    def rank_key(rank) -> float:
+        return rank if rank is not None else math.inf
+
+    @staticmethod
+    def terms(name: str, symbol: str, coin_id: str) -> set[str]:
+        return set([name, symbol, coin_id] + WORD.findall(name)) - {""}
+
+    @staticmethod
+    def entry(document: dict) -> tuple:
+        return ((document.get("name") or "").lower(), (document.get("symbol") or "").lower(),
+                document.get("market_cap_rank"), document.get("name") or "", document.get("symbol") or "")
+
+    def upsert(self,
+               coin_id: str,
+               document: dict):
+        entry = self.entry(document)
+        with self.__lock:
+            previous = self.__coins.get(coin_id)
+            if previous == entry:
+                return
+            if previous is not None:
+                self.__unindex(coin_id, previous)
+            self.__coins[coin_id] = entry
+            self.__index(coin_id, entry)
+
+    def __index(self, coin_id, entry, insert=bisect.insort):
+        name, symbol, rank = entry[:3]
+        ranked = (self.rank_key(rank), coin_id)
+        for term in self.terms(name, symbol, coin_id.lower()):
+            insert(self.__terms, (term, coin_id))
+        # Only whole fields are exact matches; a word of the name is a prefix match
+        for term in {name, symbol, coin_id.lower()} - {""}:
+            self.__exact.setdefault(term, set()).add(coin_id)
+        for prefix in self.__short_prefixes(name, symbol, coin_id.lower()):
+            insert(self.__short.setdefault(prefix, []), ranked)
+        for gram in trigrams(name) | trigrams(symbol) | trigrams(coin_id.lower()):
+            self.__grams.setdefault(gram, set()).add(coin_id)
+
+    def __unindex(self, coin_id, entry):
+        name, symbol, rank = entry[:3]
+        ranked = (self.rank_key(rank), coin_id)
+        for term in self.terms(name, symbol, coin_id.lower()):
+            index = bisect.bisect_left(self.__terms, (term, coin_id))
+            del self.__terms[index]
+        for term in {name, symbol, coin_id.lower()} - {""}:
+            self.__exact[term].discard(coin_id)
+        for prefix in self.__short_prefixes(name, symbol, coin_id.lower()):
+            coins = self.__short[prefix]
+            del coins[bisect.bisect_left(coins, ranked)]
+        for gram in trigrams(name) | trigrams(symbol) | trigrams(coin_id.lower()):
+            self.__grams[gram].discard(coin_id)
+
+    def __short_prefixes(self, name, symbol, coin_id) -> set[str]:
+        return set(term[:length] for term in self.terms(name, symbol, coin_id)
+                   for length in range(1, self.SHORT_PREFIX + 1) if len(term) >= length)
+
+    def __tier(self, coin_id, query) -> int:
+        name, symbol = self.__coins[coin_id][:2]
+        if query in (name, symbol, coin_id.lower()):
+            return 0
+        if symbol.startswith(query):
+            return 1
+        if name.startswith(query) or coin_id.lower().startswith(query):
+            return 2
+        return 3
+
+    def search(self,
+               query: str,
+               limit: int,
+               /,
+               *,
+               fuzzy_threshold: float = 0.5) -> list[dict]:
+        """Coins matching ``query`` case-insensitively.
+
+        Exact matches come first, then symbol prefixes, then name or id
+        prefixes, then prefixes of a later word of the name. Ties go to the
+        better market cap rank. Remaining slots are filled with fuzzy
+        trigram matches.
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        with self.__lock:
+            exact = sorted(self.__exact.get(query, ()), key=self.__ranking)
+            if len(query) <= self.SHORT_PREFIX:
+                matched = dict.fromkeys(exact)
+                for _, coin_id in self.__short.get(query, ()):
+                    if len(matched) >= limit:
+                        break
+                    matched.setdefault(coin_id)
+                ranked = list(matched)
+            else:
+                candidates = set()
+                index = bisect.bisect_left(self.__terms, (query,))
+                while index < len(self.__terms) and self.__terms[index][0].startswith(query):
+                    candidates.add(self.__terms[index][1])
+                    index += 1
+                ranked = sorted(candidates, key=lambda coin_id: (self.__tier(coin_id, query),) + self.__ranking(coin_id))
+            exact = set(exact)
+            results = [(coin_id, "exact" if coin_id in exact else "prefix") for coin_id in ranked[:limit]]
+            if len(query) > self.SHORT_PREFIX and len(results) < limit:
+                results += self.__fuzzy(query, limit - len(results), candidates, fuzzy_threshold)
+            return [self.__result(coin_id, match) for coin_id, match in results]
+
+    def __ranking(self, coin_id) -> tuple:
+        name, _, rank = self.__coins[coin_id][:3]
+        return self.rank_key(rank), name, coin_id
+
+    def __fuzzy(self, query, limit, excluded, threshold) -> list[tuple[str, str]]:
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.__grams.get(gram, ()))
+        minimum = threshold * len(grams)
+        scored = [(-count, self.__ranking(coin_id), coin_id) for coin_id, count in shared.items()
+                  if count >= minimum and coin_id not in excluded]
+        scored.sort()
+        return [(coin_id, "fuzzy") for _, _, coin_id in scored[:limit]]
+
+    def __result(self, coin_id, match) -> dict:
+        _, _, rank, name, symbol = self.__coins[coin_id]
+        return {"coin_id": coin_id, "name": name, "symbol": symbol, "market_cap_rank": rank, "match": match}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def current_search_index() -> Optional[SearchIndex]:
+    """The index if one was built, for incremental updates during a refresh."""
+    return _index
+
+
+def get_search_index() -> SearchIndex:
+    """The index of the current data generation. It is built from the coin
+    collection on first use, or when a refresh that did not update it
+    incrementally changed the generation."""
+    global _index
+    generation, _ = get_response_cache().generation.current()
+    if _index is None or _index.generation != generation:
+        with _index_lock:
+            if _index is None or _index.generation != generation:
+                start = time.perf_counter()
+                documents = DatabaseAdapter().find_documents(
+                    {},
+                    include_fields=["coin_id", "name", "symbol", "market_cap_rank"],
+                    exclude_fields=["_id"],
+                    batch_size=cfg.CONF.database.export_batch_size)
+                _index = SearchIndex(documents, generation=generation)
+                LOG.info(f"Search index of {len(_index)} coins built in "
+                         f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    return _index
+
+
+def stamp_search_index():
+    """Mark the index current after a refresh fed it every upserted coin."""
+    if _index is not None:
+        _index.generation, _ = get_response_cache().generation.current()
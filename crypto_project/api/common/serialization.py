@@ -0,0 +1,121 @@
+import dataclasses
+import datetime
+import decimal
+import gzip
+import threading
+import uuid
+from typing import Any
+from typing import Optional
+
+from flask import Response
+from flask import current_app
+from flask import has_request_context
+from flask import request
+from oslo_config import cfg
+from oslo_log import log as logging
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+
+LOG = logging.getLogger(__name__)
+
+
+class StdlibSerializer(object):
+    """The Flask JSON provider, backed by the stdlib json module."""
+
+    name = "stdlib"
+
+    def dumps(self,
+              obj: Any) -> bytes:
+        return current_app.json.dumps(obj, separators=(",", ":")).encode()
+
+
+class OrjsonSerializer(object):
+    """orjson, encoding the same extra types as the Flask JSON provider."""
+
+    name = "orjson"
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+               if orjson else 0)
+
+    @staticmethod
+    def _default(o: Any) -> Any:
+        if isinstance(o, datetime.date):
+            return http_date(o)
+        if isinstance(o, (decimal.Decimal, uuid.UUID)):
+            return str(o)
+        if dataclasses.is_dataclass(o):
+            return dataclasses.asdict(o)
+        if hasattr(o, "__html__"):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def dumps(self,
+              obj: Any) -> bytes:
+        return orjson.dumps(obj, default=self._default, option=self.OPTIONS)
+
+
+SERIALIZERS = {
+    "stdlib": StdlibSerializer,
+    "orjson": OrjsonSerializer,
+}
+
+_serializer = None
+_serializer_lock = threading.Lock()
+
+
+def get_serializer():
+    """The configured JSON backend; ``auto`` picks orjson when it is installed."""
+    global _serializer
+    if _serializer is None:
+        with _serializer_lock:
+            if _serializer is None:
+                backend = cfg.CONF.response.json_backend
+                if backend == "auto":
+                    backend = "orjson" if orjson else "stdlib"
+                elif backend == "orjson" and not orjson:
+                    LOG.warning("orjson is not installed, serializing responses with the stdlib json module")
+                    backend = "stdlib"
+                _serializer = SERIALIZERS[backend]()
+    return _serializer
+
+
+def available_encodings() -> list[str]:
+    return ["br", "gzip"] if brotli else ["gzip"]
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Preferred content coding of the current request, or None for identity."""
+    if not has_request_context() or cfg.CONF.response.compression_min_size < 0:
+        return None
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(data: bytes,
+             encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=cfg.CONF.response.brotli_quality)
+    return gzip.compress(data, compresslevel=cfg.CONF.response.gzip_level, mtime=0)
+
+
+def json_response(body: Any,
+                  status: int,
+                  /) -> Response:
+    """Serialize a response body, compressing it when the client accepts it
+    and it is at least ``compression_min_size`` bytes."""
+    data = get_serializer().dumps(body)
+    response = Response(data, status=status, mimetype="application/json")
+    encoding = negotiate_encoding()
+    if encoding:
+        response.vary.add("Accept-Encoding")
+        if len(data) >= cfg.CONF.response.compression_min_size:
+            response.set_data(compress(data, encoding))
+            response.content_encoding = encoding
+    return response
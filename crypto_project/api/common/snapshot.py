@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Iterable
+
+import numpy as np
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from common.mongo_adapter import DatabaseAdapter
+from crypto_project.api.common.response_cache import get_response_cache
+
+LOG = logging.getLogger(__name__)
+
+
+class MarketSnapshot(object):
+    """Read-only columns of the ranking fields of every coin.
+
+    Each metric is a float64 array aligned with ``coin_ids``, with NaN where
+    a coin has no value. ``categories`` maps a category to the row indices
+    of its coins. A snapshot is never mutated; a new one replaces it.
+    """
+
+    # Metric to its market_data field, and whether that field maps currencies to values
+    METRICS = {
+        "price": ("current_price", True),
+        "market_cap": ("market_cap", True),
+        "volume": ("total_volume", True),
+        "change_24h": ("price_change_percentage_24h", False),
+        "change_7d": ("price_change_percentage_7d", False),
+        "market_cap_change_24h": ("market_cap_change_percentage_24h", False),
+    }
+
+    def __init__(self,
+                 documents: Iterable[dict],
+                 /,
+                 *,
+                 currency: str = "usd",
+                 generation: str = None) -> None:
+        self.currency = currency
+        self.generation = generation
+        self.built_at = time.time()
+        coin_ids, names, columns, categories = [], [], dict((metric, []) for metric in self.METRICS), {}
+        for row, document in enumerate(documents):
+            coin_ids.append(document.get("coin_id"))
+            names.append(document.get("name"))
+            market_data = document.get("market_data") or {}
+            for metric, (field, per_currency) in self.METRICS.items():
+                value = market_data.get(field)
+                if per_currency:
+                    value = (value or {}).get(currency)
+                columns[metric].append(value)
+            for category in document.get("categories") or ():
+                categories.setdefault(category, []).append(row)
+        self.coin_ids = np.array(coin_ids, dtype=object)
+        self.names = np.array(names, dtype=object)
+        # None becomes NaN in a float64 column
+        self.columns = dict((metric, np.array(values, dtype=np.float64)) for metric, values in columns.items())
+        self.categories = dict((category, np.array(rows, dtype=np.intp)) for category, rows in categories.items())
+
+    @classmethod
+    def load(cls,
+             /,
+             *,
+             generation: str = None) -> "MarketSnapshot":
+        """Build a snapshot from the coin details collection, projected to the ranking fields."""
+        db = DatabaseAdapter()
+        fields = ["coin_id", "name", "categories"] + [f"market_data.{field}" for field, _ in cls.METRICS.values()]
+        documents = db.find_documents({},
+                                      include_fields=fields,
+                                      exclude_fields=["_id"],
+                                      batch_size=cfg.CONF.database.export_batch_size)
+        return cls(documents, currency=cfg.CONF.snapshot.currency, generation=generation)
+
+    def __len__(self) -> int:
+        return len(self.coin_ids)
+
+    def top(self,
+            metric: str,
+            n: int,
+            /,
+            *,
+            category: str = None,
+            ascending: bool = False) -> list[dict]:
+        """The ``n`` coins ranking highest on ``metric``, or lowest when
+        ``ascending``; coins without a value are left out.
+
+        argpartition selects the n rows in linear time and only those are
+        sorted.
+        """
+        if metric not in self.columns:
+            raise ValueError(f"Unknown metric: {metric}")
+        rows = self.categories.get(category, np.empty(0, dtype=np.intp)) if category else np.arange(len(self))
+        values = self.columns[metric][rows]
+        valid = ~np.isnan(values)
+        rows, values = rows[valid], values[valid]
+        keys = values if ascending else -values
+        if 0 < n < len(keys):
+            selected = np.argpartition(keys, n - 1)[:n]
+        else:
+            selected = np.arange(len(keys))[:max(n, 0)]
+        selected = rows[selected[np.argsort(keys[selected], kind="stable")]]
+        return self.rows(selected)
+
+    def rows(self,
+             indices: np.ndarray) -> list[dict]:
+        """Rows at ``indices`` as dicts, gathered a column at a time; NaN becomes None."""
+        columns = {"coin_id": self.coin_ids[indices].tolist(), "name": self.names[indices].tolist()}
+        for metric, column in self.columns.items():
+            values = column[indices]
+            columns[metric] = np.where(np.isnan(values), None, values).tolist()
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_market_snapshot() -> MarketSnapshot:
+    """The snapshot of the current data generation, rebuilt on first use
+    after a refresh. If a rebuild fails, the previous snapshot is served."""
+    global _snapshot
+    generation, _ = get_response_cache().generation.current()
+    if _snapshot is None or _snapshot.generation != generation:
+        with _snapshot_lock:
+            if _snapshot is None or _snapshot.generation != generation:
+                try:
+                    start = time.perf_counter()
+                    _snapshot = MarketSnapshot.load(generation=generation)
+                    LOG.info(f"Market snapshot of {len(_snapshot)} coins built in "
+                             f"{(time.perf_counter() - start) * 1000:.1f} ms")
+                except Exception as e:
+                    if _snapshot is None:
+                        raise
+                    LOG.error(f"Market snapshot rebuild failed, serving the previous one: {e}")
+    return _snapshot
+
+
+def warm_market_snapshot():
+    """Build the snapshot of a new data generation ahead of the first request."""
+    try:
+        get_market_snapshot()
+    except Exception as e:
+        LOG.error(f"Market snapshot build failed: {e}")
@@ -0,0 +1,55 @@
+from oslo_config import cfg
+
+
+class StorageSchema(object):
+    """Splits a CoinGecko coin payload into the whitelisted hot fields kept
+    in ``coin_details`` and the cold remainder.
+
+    Fields are dotted paths, so ``market_data.current_price`` keeps the
+    current prices without the rest of ``market_data``.
+    """
+
+    def __init__(self,
+                 hot_fields: list[str],
+                 /,
+                 *,
+                 archive_collection: str = None) -> None:
+        self.archive_collection = archive_collection or None
+        self.__tree = {}
+        for path in hot_fields:
+            node = self.__tree
+            parts = path.split(".")
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+                if node is True:
+                    break
+            else:
+                node[parts[-1]] = True
+
+    @classmethod
+    def from_config(cls) -> "StorageSchema":
+        return cls(cfg.CONF.storage.hot_fields,
+                   archive_collection=cfg.CONF.storage.archive_collection)
+
+    @staticmethod
+    def __split(document: dict,
+                tree: dict) -> tuple[dict, dict]:
+        hot = {}
+        cold = {}
+        for field, value in document.items():
+            subtree = tree.get(field)
+            if subtree is True:
+                hot[field] = value
+            elif subtree and isinstance(value, dict):
+                hot_value, cold_value = StorageSchema.__split(value, subtree)
+                if hot_value:
+                    hot[field] = hot_value
+                if cold_value:
+                    cold[field] = cold_value
+            else:
+                cold[field] = value
+        return hot, cold
+
+    def split(self,
+              document: dict) -> tuple[dict, dict]:
+        return self.__split(document, self.__tree)
@@ -1,16 +1,30 @@
+import base64
+import datetime
 import functools
+import json
 import re
+import threading
+import time
 from typing import Any
+from typing import Callable
+from typing import Optional
 
 import jwt
-import requests
+from cachetools import TLRUCache
+from cachetools import TTLCache
+from flask import g
 from flask import make_response
 from flask import request
 from oslo_config import cfg
+from oslo_log import log as logging
 from werkzeug.wrappers import Response
 
 from common.mongo_adapter import DatabaseAdapter
+from crypto_project.api.common.definitions import Indexes
 from crypto_project.api.common.definitions import Regex
+from crypto_project.api.common.serialization import json_response
+
+LOG = logging.getLogger(__name__)
 
 
 def pagination(limit: int,
@@ -35,14 +49,43 @@ def pagination(limit: int,
     return skip_val, limit, page_count
 
 
-def get_usd_to_cad_rate():
-    url = "https://api.exchangerate-api.com/v4/latest/USD"
-    response = requests.get(url)
-    if response.status_code == 200:
-        rates = response.json().get("rates", {})
-        return rates.get("CAD", 1)
-    else:
-        return 1
+def parse_flag(value: Any) -> bool:
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def encode_cursor(after: str) -> str:
+    """Opaque page token resuming after the given sort key."""
+    return base64.urlsafe_b64encode(json.dumps({"after": after}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Optional[str]:
+    """Sort key encoded in a page token; an empty token starts at the beginning."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(after, str):
+        raise ValueError("Invalid cursor")
+    return after
+
+
+def ensure_indexes(*,
+                   create: bool = True) -> dict[str, list[str]]:
+    """Create or verify every index in the registry; returns the indexes
+    still missing, by collection."""
+    missing = {}
+    for collection_name, indexes in Indexes.registry().items():
+        db = DatabaseAdapter()
+        db.set_collection_name(collection_name)
+        names = db.ensure_indexes(indexes, create=create)
+        if names:
+            missing[collection_name] = names
+    if missing:
+        LOG.warning(f"Missing indexes: {missing}")
+    return missing
 
 
 def validate_email(email: str) -> bool:
@@ -81,7 +124,7 @@ class RestResponses:
             "message": message,
             "data": data
         }
-        return make_response(body, 200)
+        return json_response(body, 200)
 
     @staticmethod
     def bad_request(message: str,
@@ -95,7 +138,44 @@ class RestResponses:
             "message": message,
             "data": data
         }
-        return make_response(body, 400)
+        return json_response(body, 400)
+
+    @staticmethod
+    def service_unavailable(message: str,
+                            /,
+                            *,
+                            status="unavailable",
+                            data: Any = None,
+                            retry_after: int = 1,
+                            **kwargs) -> Response:
+        body = {
+            "status": status,
+            "message": message,
+            "data": data
+        }
+        response = json_response(body, 503)
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    @staticmethod
+    def not_modified(*,
+                     etag: str,
+                     last_modified: float = None) -> Response:
+        return RestResponses.add_validators(make_response("", 304), etag=etag, last_modified=last_modified)
+
+    @staticmethod
+    def add_validators(response: Response,
+                       /,
+                       *,
+                       etag: str,
+                       last_modified: float = None) -> Response:
+        """Tag the response with a strong ETag and Last-Modified and make
+        clients revalidate before reusing it."""
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = datetime.datetime.fromtimestamp(int(last_modified), tz=datetime.timezone.utc)
+        response.cache_control.no_cache = True
+        return response
 
     @staticmethod
     def unauthorized(message: str,
@@ -109,7 +189,128 @@ class RestResponses:
             "message": message,
             "data": data
         }
-        return make_response(body, 401)
+        return json_response(body, 401)
+
+
+class TokenCache(object):
+    """Bounded cache of verified tokens to the username they belong to.
+
+    An entry lives for ``cache_ttl`` seconds but never past the token's own
+    expiry, and every token of a user is dropped when the user is
+    deactivated.
+    """
+
+    def __init__(self,
+                 maxsize: int,
+                 ttl: float,
+                 /) -> None:
+        self.ttl = ttl
+        self.__cache = TLRUCache(maxsize, ttu=self.__expires_at, timer=time.time)
+        self.__tokens_by_user = {}
+        self.__lock = threading.Lock()
+
+    def __expires_at(self, token, value, now):
+        return min(now + self.ttl, value[1])
+
+    def get(self,
+            token: str) -> Optional[str]:
+        with self.__lock:
+            value = self.__cache.get(token)
+        return value[0] if value else None
+
+    def put(self,
+            token: str,
+            username: str,
+            expires_at: float):
+        with self.__lock:
+            self.__cache[token] = (username, expires_at)
+            # Forget this user's tokens the cache itself has already evicted;
+            # only the user's own set is walked, never the whole cache
+            tokens = self.__tokens_by_user.get(username, ())
+            self.__tokens_by_user[username] = {cached for cached in tokens if cached in self.__cache} | {token}
+
+    def invalidate_user(self,
+                        username: str):
+        with self.__lock:
+            for token in self.__tokens_by_user.pop(username, ()):
+                self.__cache.pop(token, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__cache.clear()
+            self.__tokens_by_user.clear()
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCache:
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(cfg.CONF.token.cache_size, cfg.CONF.token.cache_ttl)
+    return _token_cache
+
+
+class CountCache(object):
+    """Document counts kept until the next data refresh clears them.
+
+    Counts are keyed by their normalized query and bounded to ``maxsize``
+    entries; ``ttl`` caps how stale a count may get when another replica
+    ran the refresh.
+    """
+
+    TOTAL = "__total__"
+
+    def __init__(self,
+                 maxsize: int,
+                 ttl: float,
+                 /) -> None:
+        self.__cache = TTLCache(maxsize, ttl, timer=time.time)
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(query: dict) -> str:
+        return json.dumps(query, sort_keys=True, default=str)
+
+    def get(self,
+            key: str,
+            loader: Callable[[], int]) -> int:
+        with self.__lock:
+            count = self.__cache.get(key)
+        if count is None:
+            count = loader()
+            with self.__lock:
+                self.__cache[key] = count
+        return count
+
+    def total(self,
+              loader: Callable[[], int]) -> int:
+        return self.get(self.TOTAL, loader)
+
+    def count(self,
+              query: dict,
+              loader: Callable[[dict], int]) -> int:
+        return self.get(self.key(query), lambda: loader(query))
+
+    def clear(self):
+        with self.__lock:
+            self.__cache.clear()
+
+
+_count_cache = None
+_count_cache_lock = threading.Lock()
+
+
+def get_count_cache() -> CountCache:
+    global _count_cache
+    if _count_cache is None:
+        with _count_cache_lock:
+            if _count_cache is None:
+                _count_cache = CountCache(cfg.CONF.database.count_cache_size, cfg.CONF.database.count_cache_ttl)
+    return _count_cache
 
 
 def authenticate(func):
@@ -120,23 +321,35 @@ def authenticate(func):
             return RestResponses.unauthorized("Invalid User")
 
         token = auth_header.split(" ")[1]  # Extract token
+        token_cache = get_token_cache()
+        username = token_cache.get(token)
+        if username:
+            g.username = username
+            return func(*args, **kwargs)
+
         try:
-            db = DatabaseAdapter()
-            db.set_collection_name("user")
             # Decode the JWT token
             payload = jwt.decode(token, cfg.CONF.token.JWT_SECRET_KEY, algorithms=["HS256"])
             username = payload.get("username")
 
             # Validate user existence in the database
-            if not db.find_document({"username": username}):
+            db = DatabaseAdapter()
+            db.set_collection_name("user")
+            user = db.find_document({"username": username})
+            if not user:
                 return RestResponses.unauthorized("User not found")
+            if user.get("status", "active") != "active":
+                return RestResponses.unauthorized("User is not active")
 
-            # Pass user info to the protected route
-            return func(*args, **kwargs)
+            token_cache.put(token, username, payload.get("exp", float("inf")))
+            g.username = username
 
         except jwt.ExpiredSignatureError:
             return RestResponses.unauthorized("Token has expired")
         except jwt.InvalidTokenError:
             return RestResponses.unauthorized("Invalid token")
 
+        # Pass user info to the protected route
+        return func(*args, **kwargs)
+
     return wrapper
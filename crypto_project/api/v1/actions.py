@@ -1,20 +1,52 @@
 import datetime
 import threading
 import time
+from typing import Optional
 
+import bson
 import jwt
-import requests
 from flask import Flask
+from flask import stream_with_context
 from oslo_config import cfg
 from oslo_log import log as logging
-from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo.errors import DuplicateKeyError
 from werkzeug.wrappers import Response
 
 from common.mongo_adapter import DatabaseAdapter
 from crypto_project.api.common import utils
-from crypto_project.api.common.definitions import Urls
+from crypto_project.api.common.batching import LookupCoalescer
+from crypto_project.api.common.definitions import JobStatus
+from crypto_project.api.common.fx import FXRateCache
+from crypto_project.api.common.fx import FXRatesUnavailable
+from crypto_project.api.common.fx import convert_prices
+from crypto_project.api.common.fx import get_fx_rates
+from crypto_project.api.common.hashing import HashingUnavailable
+from crypto_project.api.common.hashing import get_password_hasher
+from crypto_project.api.common.history import PriceHistory
+from crypto_project.api.common.ingestion import CoinGeckoError
+from crypto_project.api.common.ingestion import IngestionEngine
+from crypto_project.api.common.leases import LeaseLost
+from crypto_project.api.common.leases import ShardLease
+from crypto_project.api.common.refresh import ChangeDetector
+from crypto_project.api.common.refresh import RefreshJob
+from crypto_project.api.common.refresh import RefreshStats
+from crypto_project.api.common.refresh import RefreshScheduler
+from crypto_project.api.common.response_cache import get_response_cache
+from crypto_project.api.common.search import current_search_index
+from crypto_project.api.common.search import get_search_index
+from crypto_project.api.common.search import stamp_search_index
+from crypto_project.api.common.serialization import get_serializer
+from crypto_project.api.common.snapshot import get_market_snapshot
+from crypto_project.api.common.snapshot import warm_market_snapshot
+from crypto_project.api.common.storage import StorageSchema
 from crypto_project.api.common.utils import RestResponses
+from crypto_project.api.common.utils import decode_cursor
+from crypto_project.api.common.utils import encode_cursor
+from crypto_project.api.common.utils import get_count_cache
 from crypto_project.api.common.utils import pagination
+from crypto_project.api.common.utils import parse_flag
+
+CATEGORIES_COLLECTION = "categories"
 
 data_refresh_lock = threading.Lock()
 app = Flask(__name__)
@@ -26,9 +58,51 @@ class CoinDetails:
     def __init__(self):
         self.db = DatabaseAdapter()
 
+    @staticmethod
+    def keyset_query(query: dict,
+                     cursor: str) -> dict:
+        """Restrict the query to coins after the cursor; pages are ordered on
+        the indexed coin_id so every page costs the same whatever its depth."""
+        after = decode_cursor(cursor)
+        if after is None:
+            return query
+        after_query = {"coin_id": {"$gt": after}}
+        return {"$and": [query, after_query]} if query else after_query
+
+    @staticmethod
+    def keyset_limit(value) -> int:
+        """Page size of a cursor request, 10 when omitted."""
+        limit = int(10 if value in (None, "") else value)
+        if not 0 < limit <= cfg.CONF.database.max_page_size:
+            raise ValueError(f"limit must be between 1 and {cfg.CONF.database.max_page_size}")
+        return limit
+
+    @staticmethod
+    def keyset_page(documents: list[dict],
+                    limit: int) -> tuple[list[dict], Optional[str]]:
+        """Split ``limit + 1`` fetched coins into the page and its next cursor."""
+        next_cursor = encode_cursor(documents[limit - 1]["coin_id"]) if len(documents) > limit else None
+        return documents[:limit], next_cursor
+
     def get_coins_list(self, req_args: dict) -> Response:
+        if "cursor" in req_args:
+            try:
+                limit = self.keyset_limit(req_args.get('limit'))
+                coins = self.db.find_documents(self.keyset_query({}, req_args["cursor"]),
+                                               include_fields=["coin_id", "symbol", "name"],
+                                               exclude_fields=["_id"],
+                                               sort=[("coin_id", 1)],
+                                               limit=limit + 1)
+                coins, next_cursor = self.keyset_page(list(coins), limit)
+            except ValueError as e:
+                return RestResponses.bad_request(str(e))
+            data = {"coins": coins, "next_cursor": next_cursor, "limit": limit}
+            if parse_flag(req_args.get("include_total")):
+                data["total"] = get_count_cache().total(self.db.estimated_count)
+            return RestResponses.success("Coins list fetched successfully", data=data)
+
         try:
-            total_count = self.db.get_count({})
+            total_count = get_count_cache().total(self.db.estimated_count)
             page_count = 1
             page = 0
             limit = 0
@@ -56,81 +130,412 @@ class CoinDetails:
             LOG.error(f"Error fetching coins list: {e}")
             return RestResponses.bad_request("An error occurred while fetching the coins list")
 
-    def get_coin_categories(self) -> Response:
-        data = self.db.get_distinct("categories", query={})
+    def rebuild_categories(self):
+        """Materialize per-category coin counts and ids into the categories
+        collection; ``$out`` swaps the new contents in atomically."""
+        self.db.aggregate([
+            {"$project": {"_id": 0, "coin_id": 1, "categories": 1}},
+            {"$unwind": "$categories"},
+            {"$match": {"categories": {"$ne": None}}},
+            {"$sort": {"coin_id": 1}},
+            {"$group": {"_id": "$categories", "count": {"$sum": 1}, "coin_ids": {"$push": "$coin_id"}}},
+            {"$out": CATEGORIES_COLLECTION}
+        ])
+
+    def materialize_categories(self):
+        """Startup migration for coins stored before categories were
+        materialized; later refreshes keep the collection current."""
+        categories_db = DatabaseAdapter()
+        categories_db.set_collection_name(CATEGORIES_COLLECTION)
+        if not categories_db.get_count({}) and self.db.get_count({}):
+            LOG.info("Materializing the categories of the stored coins")
+            self.rebuild_categories()
+
+    def get_coin_categories(self, req_args: dict = None) -> Response:
+        with_counts = parse_flag((req_args or {}).get("counts"))
+        categories_db = DatabaseAdapter()
+        categories_db.set_collection_name(CATEGORIES_COLLECTION)
+        categories = list(categories_db.find_documents({}, exclude_fields=["coin_ids"], sort=[("_id", 1)]))
+        if with_counts:
+            data = [{"name": category["_id"], "count": category["count"]} for category in categories]
+        else:
+            data = [category["_id"] for category in categories]
         return RestResponses.success("Categories retrieved Successfully", data={"categories": data})
 
+    def get_category_coins(self, category: str) -> Response:
+        categories_db = DatabaseAdapter()
+        categories_db.set_collection_name(CATEGORIES_COLLECTION)
+        document = categories_db.find_document({"_id": category})
+        if not document:
+            return RestResponses.bad_request("Category not found")
+        return RestResponses.success("Category coins retrieved Successfully", data={
+            "category": category,
+            "count": document["count"],
+            "coin_ids": document["coin_ids"]
+        })
+
+    EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+    def export_coins(self, req_args: dict) -> Response:
+        """Stream every coin, ordered on coin_id, as NDJSON or a chunked JSON
+        array. The Mongo cursor is walked one batch at a time, so memory stays
+        flat whatever the collection size."""
+        export_format = req_args.get("format", "ndjson")
+        if export_format not in self.EXPORT_FORMATS:
+            return RestResponses.bad_request("format must be ndjson or json")
+        fields = [field for field in req_args.get("fields", "coin_id,symbol,name").split(",") if field]
+        allowed = ["coin_id"] + cfg.CONF.storage.hot_fields
+        unknown = [field for field in fields
+                   if not any(field == path or field.startswith(path + ".") for path in allowed)]
+        if unknown:
+            return RestResponses.bad_request(f"Unknown fields: {', '.join(unknown)}")
+
+        documents = self.db.find_documents({},
+                                           include_fields=fields,
+                                           exclude_fields=["_id"],
+                                           sort=[("coin_id", 1)],
+                                           batch_size=cfg.CONF.database.export_batch_size)
+        dumps = get_serializer().dumps
+
+        def ndjson():
+            for document in documents:
+                yield dumps(document) + b"\n"
+
+        def json_array():
+            yield b"["
+            for index, document in enumerate(documents):
+                yield b"," + dumps(document) if index else dumps(document)
+            yield b"]"
+
+        body = ndjson() if export_format == "ndjson" else json_array()
+        return Response(stream_with_context(body), mimetype=self.EXPORT_FORMATS[export_format])
+
     def specific_coins_details(self,
                                req_body: dict):
         filters = req_body.get("filters", {})
-        coin_ids = filters.get("coin_ids", [])
-        categories = filters.get("categories", [])
+        # Sorted and deduplicated so equivalent filters share a cached count
+        coin_ids = sorted(set(filters.get("coin_ids", [])))
+        categories = sorted(set(filters.get("categories", [])))
         query = {
-            "$or": [
-                {"coin_id": {"$in": coin_ids}},
-                {"categories": {"$in": categories}}
+            "$and": [
+                {"$or": [
+                    {"coin_id": {"$in": coin_ids}},
+                    {"categories": {"$in": categories}}
+                ]},
+                # Coins without a price are filtered before paginating so pages stay full
+                {"market_data.current_price": {"$nin": [None, {}]}}
             ]
         }
+        # The whole CoinGecko current_price map is stored. CAD is served as stored; any other currency is
+        # the stored USD price times the cached exchangerate-api rate, so it may differ from CoinGecko's own
+        # price in that currency
+        vs_currency = str(req_body.get("vs_currency") or "cad").lower()
+        rate = None
+        if vs_currency != "cad":
+            try:
+                rate = get_fx_rates().rate(vs_currency)
+            except ValueError as e:
+                return RestResponses.bad_request(str(e))
+            except FXRatesUnavailable as e:
+                return RestResponses.service_unavailable(str(e), retry_after=FXRateCache.RETRY_INTERVAL)
+        price = {"source": "usd", "field": "price_usd"} if rate else {"source": "cad", "field": "current_price_cad"}
+
+        if "cursor" in req_body:
+            try:
+                limit = self.keyset_limit(req_body.get('limit'))
+                result = list(self.db.aggregate(self.coin_prices_pipeline(self.keyset_query(query, req_body["cursor"]),
+                                                                          limit=limit + 1, **price)))
+            except ValueError as e:
+                return RestResponses.bad_request(str(e))
+            result, next_cursor = self.keyset_page(result, limit)
+            if rate:
+                convert_prices(result, rate, source="price_usd", target=f"current_price_{vs_currency}")
+            data = {"coins": result, "next_cursor": next_cursor, "limit": limit}
+            if parse_flag(req_body.get("include_total")):
+                data["total"] = get_count_cache().count(query, self.db.get_count)
+            return RestResponses.success("Coins details fetched successfull", data=data)
+
         page = int(req_body.get('page', 0))
         limit = int(req_body.get('limit', 0))
-        total_count = self.db.get_count(query)
+        total_count = get_count_cache().count(query, self.db.get_count)
         skip_val, limit, page_count = pagination(limit, page, total_count, 1, skip_val=0)
-        data = self.db.find_documents(query,
-                                      skip_val=skip_val,
-                                      limit=limit)
-        data = list(data)
-        result = []
-
-        for coin in data:
-            market_data = coin.get("market_data", {})
-            current_price = market_data.get("current_price", {})
-            if not current_price:
-                continue
-
-            cad_price = current_price.get("cad")
-            result.append({
-                "coin_id": coin.get("coin_id"),
-                "name": coin.get("name"),
-                "categories": coin.get("categories"),
-                "current_price_cad": cad_price
-            })
-
+        result = list(self.db.aggregate(self.coin_prices_pipeline(query, skip_val=skip_val, limit=limit, **price)))
+        if rate:
+            convert_prices(result, rate, source="price_usd", target=f"current_price_{vs_currency}")
         return RestResponses.success("Coins details fetched successfull", data=result)
 
+    def lookup_coins(self,
+                     req_body: dict) -> Response:
+        """Coins by id, in the order of ``coin_ids``, with None for unknown ids.
+
+        Concurrent lookups are coalesced into one ``$in`` query per batching
+        window, so overlapping id sets are fetched once.
+        """
+        coin_ids = req_body.get("coin_ids")
+        if not isinstance(coin_ids, list) or not coin_ids or not all(isinstance(c, str) for c in coin_ids):
+            return RestResponses.bad_request("coin_ids must be a non-empty list of strings")
+        if len(coin_ids) > cfg.CONF.batch.max_ids:
+            return RestResponses.bad_request(f"At most {cfg.CONF.batch.max_ids} coin_ids may be looked up at once")
+        vs_currency = str(req_body.get("vs_currency") or "cad").lower()
+        rate = None
+        if vs_currency != "cad":
+            try:
+                rate = get_fx_rates().rate(vs_currency)
+            except ValueError as e:
+                return RestResponses.bad_request(str(e))
+            except FXRatesUnavailable as e:
+                return RestResponses.service_unavailable(str(e), retry_after=FXRateCache.RETRY_INTERVAL)
+
+        found = coin_lookup.get_many(coin_ids)
+        source = "usd" if rate else "cad"
+        # The batch results are shared with the other callers, so each response gets its own copies
+        coins = []
+        for coin_id in coin_ids:
+            coin = found.get(coin_id)
+            coins.append(None if coin is None else {"coin_id": coin_id,
+                                                    "name": coin.get("name"),
+                                                    "categories": coin.get("categories"),
+                                                    "price": coin.get(source)})
+        located = [coin for coin in coins if coin is not None]
+        if rate:
+            convert_prices(located, rate, source="price", target=f"current_price_{vs_currency}")
+        else:
+            for coin in located:
+                coin["current_price_cad"] = coin.pop("price")
+        missing = list(dict.fromkeys(coin_id for coin_id in coin_ids if coin_id not in found))
+        return RestResponses.success("Coins looked up successfully", data={"coins": coins, "missing": missing})
+
+    @staticmethod
+    def fetch_coins(coin_ids: list[str]) -> dict[str, dict]:
+        """Coins of ``coin_ids`` by id, with their CAD and USD prices, in one query."""
+        pipeline = [
+            {"$match": {"coin_id": {"$in": coin_ids}}},
+            {"$project": {
+                "_id": 0,
+                "coin_id": 1,
+                "name": 1,
+                "categories": 1,
+                "cad": {"$ifNull": ["$market_data.current_price.cad", None]},
+                "usd": {"$ifNull": ["$market_data.current_price.usd", None]}
+            }}
+        ]
+        return dict((coin["coin_id"], coin) for coin in DatabaseAdapter().aggregate(pipeline))
+
+    @staticmethod
+    def coin_prices_pipeline(query: dict,
+                             /,
+                             *,
+                             skip_val: int = 0,
+                             limit: int = 0,
+                             source: str = "cad",
+                             field: str = "current_price_cad") -> list[dict]:
+        """Matching coins reduced to their id, name, categories and price in
+        the ``source`` currency on the server, so the full coin documents
+        never leave Mongo."""
+        pipeline = [{"$match": query}, {"$sort": {"coin_id": 1}}]
+        if limit:
+            pipeline += [{"$skip": skip_val}, {"$limit": limit}]
+        pipeline.append({"$project": {
+            "_id": 0,
+            "coin_id": 1,
+            "name": 1,
+            "categories": 1,
+            field: {"$ifNull": [f"$market_data.current_price.{source}", None]}
+        }})
+        return pipeline
+
     def data_refresh(self) -> Response:
         with app.app_context():  # Ensure we are in the app context
+            if not data_refresh_lock.acquire(blocking=False):
+                LOG.info("Data refresh already in progress")
+                return RestResponses.success("Data refresh already in progress")
+            search_index = current_search_index()
+            completed = False
             try:
-                url = Urls.COINS_LIST_URL
-                headers = {"accept": "application/json"}
-
-                response = requests.get(url, headers=headers)
-                if response.status_code != 200:
-                    LOG.error("Coins list API failed!")
-                    return RestResponses.bad_request("Coins list API failed!")
-
-                for i in response.json():
+                with IngestionEngine() as engine:
                     try:
-                        coin_id_url = Urls.COIN_ID_URL.format(i['id'])
-                        coin_response = requests.get(coin_id_url, headers=headers)
-
-                        # Handle rate limit response
-                        if coin_response.status_code == 429:
-                            LOG.warning(f"Rate limit hit for coin: {i['id']}. Retrying...")
-                            time.sleep(60)
-                            coin_response = requests.get(coin_id_url, headers=headers)
-
-                        if coin_response.status_code == 200:
-                            coin_data = coin_response.json()
-                            self.db.update_document({"coin_id": i["id"]}, {"$set": coin_data}, upsert=True)
-                    except Exception as e:
-                        LOG.error(f"Error updating coin {i['id']}: {e}")
-
-                LOG.info("Data refresh completed successfully")
-                return RestResponses.success("Data refresh completed successfully")
+                        coins = engine.fetch_coins_list()
+                    except CoinGeckoError as e:
+                        LOG.error(f"Coins list API failed! {e}")
+                        return RestResponses.bad_request("Coins list API failed!")
+
+                    coin_ids = [i['id'] for i in coins]
+                    shard_count = cfg.CONF.refresh.shard_count
+                    if shard_count > 1:
+                        # Replicas split the universe by claiming shard leases until none are left
+                        stats = RefreshStats()
+                        # Each shard is claimed at most once per run, even after its min age passed
+                        claimed = set()
+                        while lease := ShardLease.claim(shard_count, exclude=claimed):
+                            claimed.add(lease.shard)
+                            try:
+                                with lease:
+                                    stats.add(self.refresh_coins(engine, lease.coin_ids(coin_ids),
+                                                                 shard=lease.shard, lease=lease))
+                            except LeaseLost as e:
+                                # The replica that took the shard over resumes its job
+                                LOG.warning(f"{e}, moving on to the next shard")
+                    else:
+                        stats = self.refresh_coins(engine, coin_ids)
+
+                self.rebuild_categories()
+                LOG.info(f"Data refresh completed successfully: {stats.refreshed} refreshed, "
+                         f"{stats.unchanged} unchanged, {stats.failed} failed, slim storage saved "
+                         f"{stats.bytes_received - stats.bytes_stored} of {stats.bytes_received} bytes")
+                completed = True
+                return RestResponses.success("Data refresh completed successfully", data=stats.to_dict())
 
             except Exception as e:
                 LOG.error(f"Error during data refresh: {e}")
                 return RestResponses.bad_request("Data refresh failed due to an error")
+            finally:
+                try:
+                    self.__update_derived_data(completed, search_index)
+                finally:
+                    data_refresh_lock.release()
+
+    @staticmethod
+    def __update_derived_data(completed: bool,
+                              search_index):
+        """Bring the caches and in-memory indexes up to date after a refresh.
+        A failing step is logged and the remaining ones still run."""
+        # Even a failed run may have written coins
+        steps = [("count cache", lambda: get_count_cache().clear()),
+                 ("response cache", lambda: get_response_cache().invalidate()),
+                 ("market snapshot", warm_market_snapshot)]
+        # Other shards are written by other replicas, so only an unsharded run kept the index whole
+        if completed and cfg.CONF.refresh.shard_count == 1 and search_index is current_search_index():
+            steps.append(("search index", stamp_search_index))
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                LOG.error(f"Updating the {name} after a data refresh failed: {e}")
+
+    def refresh_coins(self,
+                      engine: IngestionEngine,
+                      coin_ids: list[str],
+                      /,
+                      *,
+                      shard: int = None,
+                      lease: ShardLease = None) -> RefreshStats:
+        job = RefreshJob.start(coin_ids, shard=shard)
+        schema = StorageSchema.from_config()
+        history = PriceHistory.from_config()
+        # A resumed job fetches again the coins it finished past its last checkpoint; they keep their first point
+        recorded = history.recorded_coins(job.id) if history.enabled and job.resumed else set()
+        try:
+            with self.db.bulk_writer() as writer, history.writer() as history_writer:
+                detector = ChangeDetector(self.db, writer, stats=job.stats)
+                archiver = None
+                if schema.archive_collection:
+                    archive_db = DatabaseAdapter()
+                    archive_db.set_collection_name(schema.archive_collection)
+                    archiver = ChangeDetector(archive_db, archive_db.bulk_writer())
+
+                for coin_id, coin_data, error in engine.fetch_coins(job.pending_ids):
+                    if error:
+                        LOG.error(f"Error fetching coin {coin_id}: {error}")
+                        detector.fail(coin_id, error)
+                    elif coin_data:
+                        hot, cold = schema.split(coin_data)
+                        detector.stats.bytes_received += len(bson.encode(coin_data))
+                        detector.stats.bytes_stored += len(bson.encode(hot))
+                        detector.add(coin_id, hot)
+                        if search_index := current_search_index():
+                            search_index.upsert(coin_id, coin_data)
+                        if archiver and cold:
+                            archiver.add(coin_id, cold)
+                        if history.enabled and coin_id not in recorded:
+                            # Stamped on arrival: a full refresh spans hours
+                            history.record(history_writer, coin_id, coin_data, int(time.time()), run=job.id)
+                    if job.mark_done(coin_id):
+                        if archiver:
+                            archiver.sync()
+                        history_writer.flush()
+                        job.checkpoint(detector.sync())
+                    if lease:
+                        lease.ensure_held()
+                if archiver:
+                    archiver.sync()
+                stats = detector.sync()
+        except LeaseLost:
+            # The job now belongs to the replica that took the shard over
+            raise
+        except Exception:
+            job.fail()
+            raise
+        job.checkpoint(stats, status=JobStatus.COMPLETED)
+        return stats
+
+    def search_coins(self, req_args: dict) -> Response:
+        query = req_args.get("q", "")
+        if not query.strip():
+            return RestResponses.bad_request("q is required")
+        try:
+            limit = int(req_args.get("limit") or 10)
+        except ValueError:
+            return RestResponses.bad_request("limit must be an integer")
+        if not 0 < limit <= cfg.CONF.search.max_results:
+            return RestResponses.bad_request(f"limit must be between 1 and {cfg.CONF.search.max_results}")
+        coins = get_search_index().search(query, limit, fuzzy_threshold=cfg.CONF.search.fuzzy_threshold)
+        return RestResponses.success("Coins search completed successfully", data={"query": query, "coins": coins})
+
+    def top_coins(self, req_args: dict) -> Response:
+        """Coins ranked on a market metric, answered from the in-memory snapshot."""
+        metric = req_args.get("metric", "change_24h")
+        try:
+            n = int(req_args.get("n") or 50)
+        except ValueError:
+            return RestResponses.bad_request("n must be an integer")
+        if not 0 < n <= cfg.CONF.snapshot.max_results:
+            return RestResponses.bad_request(f"n must be between 1 and {cfg.CONF.snapshot.max_results}")
+        order = req_args.get("order", "desc")
+        if order not in ("asc", "desc"):
+            return RestResponses.bad_request("order must be asc or desc")
+
+        snapshot = get_market_snapshot()
+        try:
+            coins = snapshot.top(metric, n, category=req_args.get("category"), ascending=order == "asc")
+        except ValueError as e:
+            return RestResponses.bad_request(str(e))
+        return RestResponses.success("Top coins fetched successfully", data={
+            "metric": metric,
+            "order": order,
+            "currency": snapshot.currency,
+            "coins": coins
+        })
+
+    def coin_history(self,
+                     coin_id: str,
+                     req_args: dict) -> Response:
+        """Price points of a coin over a time range, or OHLC candles when an
+        ``interval`` in seconds is given."""
+        history = PriceHistory.from_config()
+        try:
+            end = int(req_args.get("end") or time.time())
+            start = int(req_args.get("start") or end - 86400)
+            interval = int(req_args.get("interval") or 0)
+        except ValueError:
+            return RestResponses.bad_request("start, end and interval must be integers")
+        if start >= end or interval < 0:
+            return RestResponses.bad_request("start must precede end and interval must be positive")
+        if interval and (end - start) / interval > cfg.CONF.history.max_candles:
+            return RestResponses.bad_request(f"At most {cfg.CONF.history.max_candles} candles can be requested")
+
+        data = {"coin_id": coin_id, "currency": history.currency, "start": start, "end": end}
+        if interval:
+            data.update(interval=interval, candles=history.candles(coin_id, start, end, interval))
+        else:
+            data.update(points=history.points(coin_id, start, end))
+        return RestResponses.success("Coin history fetched successfully", data=data)
+
+    def data_refresh_status(self) -> Response:
+        document = RefreshJob.latest()
+        if not document:
+            return RestResponses.success("No data refresh has run yet", data=None)
+        return RestResponses.success("Data refresh status fetched successfully",
+                                     data=RefreshJob.progress(document))
 
 
 class User:
@@ -154,20 +559,25 @@ class User:
             return RestResponses.bad_request(
                 "Invalid Password, Passwords may only contain alphanumeric and special characters (.?!@#$%^&*-), and must start with an alphabetic character as well as include at least one number and special character.")
 
-        query = {
-            "username": username,
-            "email": email
-        }
-        if self.db.find_document(query):
+        # Usernames are unique on their own; the unique index backs this check against races
+        if self.db.find_document({"username": username}):
             return RestResponses.bad_request("User already Exists")
 
+        try:
+            password_hash = get_password_hasher().hash(password)
+        except HashingUnavailable:
+            return RestResponses.service_unavailable("Too many signups in progress, please retry")
+
         doc = {
             "username": username,
-            "password": generate_password_hash(password),
+            "password": password_hash,
             "email": email,
             "status": "active"
         }
-        user_id = self.db.insert_document(doc)
+        try:
+            user_id = self.db.insert_document(doc)
+        except DuplicateKeyError:
+            return RestResponses.bad_request("User already Exists")
         return RestResponses.success("User Created Successfully", data={"user_id": str(user_id.inserted_id)})
 
     def user_login_user(self,
@@ -178,8 +588,13 @@ class User:
         user = self.db.find_document({
             "username": username
         })
-        if not user or not check_password_hash(user['password'], password):
+        if not user:
             return RestResponses.unauthorized("Invalid username or password!")
+        try:
+            if not get_password_hasher().verify(user['password'], password):
+                return RestResponses.unauthorized("Invalid username or password!")
+        except HashingUnavailable:
+            return RestResponses.service_unavailable("Too many logins in progress, please retry")
 
         # Generate JWT token
         token = jwt.encode({
@@ -187,3 +602,16 @@ class User:
             "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1)  # Token expires in 1 hour
         }, cfg.CONF.token.JWT_SECRET_KEY, algorithm="HS256")
         return RestResponses.success("Login successfullu", data={"username": username, "access_token": token})
+
+    def deactivate_user(self,
+                        username: str) -> Response:
+        result = self.db.update_document({"username": username}, {"$set": {"status": "inactive"}}, upsert=False)
+        if not result.matched_count:
+            return RestResponses.bad_request("User not found")
+        # Drop cached verifications so the user's tokens stop working immediately
+        utils.get_token_cache().invalidate_user(username)
+        return RestResponses.success("User deactivated successfully", data={"username": username})
+
+
+refresh_scheduler = RefreshScheduler(lambda: CoinDetails().data_refresh())
+coin_lookup = LookupCoalescer(CoinDetails.fetch_coins)
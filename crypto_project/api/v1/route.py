@@ -1,14 +1,18 @@
 import json
-import threading
 
 from flasgger import swag_from
 from flask import Blueprint
+from flask import g
 from flask import request
 
+from crypto_project.api.common.fx import fx_cache_variant
+from crypto_project.api.common.response_cache import cached_response
+from crypto_project.api.common.response_cache import get_response_cache
 from crypto_project.api.common.utils import RestResponses
 from crypto_project.api.common.utils import authenticate
 from crypto_project.api.v1.actions import CoinDetails
 from crypto_project.api.v1.actions import User
+from crypto_project.api.v1.actions import refresh_scheduler
 
 coinapp = Blueprint('coinapp', __name__, template_folder='templates')
 
@@ -167,6 +171,58 @@ def user_login():
     return user.user_login_user(req_body)
 
 
+@authapp.post("/v1/auth/deactivate")
+@authenticate
+@swag_from({
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'description': 'Bearer token of the user to deactivate',
+            'required': True,
+            'type': 'string'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'User deactivated; all of the user\'s tokens stop working',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {
+                        'type': 'string',
+                        'description': 'Success message',
+                        'example': 'User deactivated successfully'
+                    },
+                    'data': {
+                        'type': 'object',
+                        'properties': {
+                            'username': {
+                                'type': 'string',
+                                'description': 'Deactivated username',
+                                'example': 'allwin'
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        401: {
+            'description': 'Unauthorized',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'description': 'Error message'}
+                }
+            }
+        }
+    }
+})
+def user_deactivate():
+    user = User()
+    return user.deactivate_user(g.username)
+
+
 @coinapp.get("/v1/data_refresh")
 @swag_from({
     'responses': {
@@ -199,16 +255,78 @@ def user_login():
     }
 })
 def data_refresh():
-    # Run the `data_refresh` function in a separate thread
-    coin_details = CoinDetails()
-    thread = threading.Thread(target=coin_details.data_refresh, daemon=True)
-    thread.start()
+    # Run the `data_refresh` function in a separate thread, unless one is already running
+    if not refresh_scheduler.trigger():
+        return RestResponses.success("Data refresh already in progress. Check /v1/data_refresh/status for details.")
     # Return success response immediately
     return RestResponses.success("Data refresh process started. Check logs for details.")
 
 
+@coinapp.get("/v1/data_refresh/status")
+@swag_from({
+    'responses': {
+        200: {
+            'description': 'Progress of the current or most recent data refresh job.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'job_id': {'type': 'string', 'description': 'Refresh job identifier'},
+                    'status': {'type': 'string', 'description': 'running, completed or failed'},
+                    'cursor': {'type': 'string', 'description': 'Last coin id below which every coin is stored'},
+                    'total': {'type': 'integer', 'description': 'Number of coins in the refresh'},
+                    'processed': {'type': 'integer', 'description': 'Number of coins processed so far'},
+                    'refreshed': {'type': 'integer', 'description': 'Number of coins written'},
+                    'unchanged': {'type': 'integer', 'description': 'Number of coins skipped as unchanged'},
+                    'failed': {'type': 'integer', 'description': 'Number of coins that failed'},
+                    'errors': {'type': 'array', 'description': 'Most recent coin errors', 'items': {'type': 'object'}},
+                    'coins_per_sec': {'type': 'number', 'description': 'Throughput of the current run'},
+                    'eta_seconds': {'type': 'number', 'description': 'Estimated seconds until the run completes'}
+                }
+            }
+        }
+    }
+})
+def data_refresh_status():
+    coin_details = CoinDetails()
+    return coin_details.data_refresh_status()
+
+
+@coinapp.get("/v1/cache/stats")
+@authenticate
+@swag_from({
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'description': 'Bearer token for authentication',
+            'required': True,
+            'type': 'string'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Hit and miss counters of the response cache.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'hits': {'type': 'integer', 'description': 'Responses served from the cache'},
+                    'misses': {'type': 'integer', 'description': 'Responses computed and cached'},
+                    'hit_ratio': {'type': 'number', 'description': 'Share of lookups served from the cache'},
+                    'size': {'type': 'integer', 'description': 'Number of cached responses'},
+                    'maxsize': {'type': 'integer', 'description': 'Maximum number of cached responses'},
+                    'generation': {'type': 'string', 'description': 'Data generation the cached responses belong to'}
+                }
+            }
+        }
+    }
+})
+def cache_stats():
+    return RestResponses.success("Cache statistics fetched successfully", data=get_response_cache().stats())
+
+
 @coinapp.get("/v1/coins")
 @authenticate
+@cached_response
 @swag_from({
     'parameters': [
         {
@@ -233,6 +351,21 @@ def data_refresh():
             'required': False,
             'type': 'integer',
             'example': 1
+        },
+        {
+            'name': 'cursor',
+            'in': 'query',
+            'description': 'Opaque token from next_cursor; pass it empty for the first page. '
+                           'Switches to cursor pagination ordered on coin_id',
+            'required': False,
+            'type': 'string'
+        },
+        {
+            'name': 'include_total',
+            'in': 'query',
+            'description': 'Include the total coin count in cursor pagination responses',
+            'required': False,
+            'type': 'boolean'
         }
     ],
     'responses': {
@@ -277,8 +410,339 @@ def get_coins_list():
     return coin_details.get_coins_list(req_args)
 
 
+@coinapp.get("/v1/coins/export")
+@authenticate
+@swag_from({
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'description': 'Bearer token for authentication',
+            'required': True,
+            'type': 'string'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'description': 'Comma separated coin fields to export, as dotted paths',
+            'required': False,
+            'type': 'string',
+            'example': 'coin_id,symbol,name,market_data.current_price.usd'
+        },
+        {
+            'name': 'format',
+            'in': 'query',
+            'description': 'ndjson for one coin per line, json for a single array',
+            'required': False,
+            'type': 'string',
+            'enum': ['ndjson', 'json'],
+            'example': 'ndjson'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Every coin ordered by coin_id, streamed as NDJSON or a JSON array',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'coin_id': {'type': 'string', 'description': 'Coin ID'},
+                    'name': {'type': 'string', 'description': 'Coin\'s name'},
+                    'symbol': {'type': 'string', 'description': 'Coin\'s symbol'},
+                }
+            }
+        },
+        400: {
+            'description': 'Unknown format or fields',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {
+                        'type': 'string',
+                        'description': 'Error message'
+                    }
+                }
+            }
+        }
+    }
+})
+def export_coins():
+    req_args = request.args.to_dict()
+    coin_details = CoinDetails()
+    return coin_details.export_coins(req_args)
+
+
+@coinapp.get("/v1/coins/search")
+@authenticate
+@swag_from({
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'description': 'Bearer token for authentication',
+            'required': True,
+            'type': 'string'
+        },
+        {
+            'name': 'q',
+            'in': 'query',
+            'description': 'Case-insensitive prefix of a coin name, name word, symbol or coin id; '
+                           'close misspellings are matched too',
+            'required': True,
+            'type': 'string',
+            'example': 'bitc'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'description': 'Number of coins to return',
+            'required': False,
+            'type': 'integer',
+            'example': 10
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Matching coins, exact matches first, then by match kind and market cap rank',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'query': {'type': 'string'},
+                    'coins': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'coin_id': {'type': 'string'},
+                                'name': {'type': 'string'},
+                                'symbol': {'type': 'string'},
+                                'market_cap_rank': {'type': 'integer'},
+                                'match': {'type': 'string', 'description': 'exact, prefix or fuzzy'}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Missing query or invalid limit',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {
+                        'type': 'string',
+                        'description': 'Error message'
+                    }
+                }
+            }
+        }
+    }
+})
+def search_coins():
+    req_args = request.args.to_dict()
+    coin_details = CoinDetails()
+    return coin_details.search_coins(req_args)
+
+
+@coinapp.get("/v1/coins/top")
+@authenticate
+@swag_from({
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'description': 'Bearer token for authentication',
+            'required': True,
+            'type': 'string'
+        },
+        {
+            'name': 'metric',
+            'in': 'query',
+            'description': 'Ranking metric',
+            'required': False,
+            'type': 'string',
+            'enum': ['price', 'market_cap', 'volume', 'change_24h', 'change_7d', 'market_cap_change_24h'],
+            'example': 'change_24h'
+        },
+        {
+            'name': 'n',
+            'in': 'query',
+            'description': 'Number of coins to return',
+            'required': False,
+            'type': 'integer',
+            'example': 50
+        },
+        {
+            'name': 'category',
+            'in': 'query',
+            'description': 'Only rank coins of this category',
+            'required': False,
+            'type': 'string',
+            'example': 'Layer 1 (L1)'
+        },
+        {
+            'name': 'order',
+            'in': 'query',
+            'description': 'desc for the highest values first, asc for the lowest',
+            'required': False,
+            'type': 'string',
+            'enum': ['desc', 'asc']
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Coins ranked on the metric, from the snapshot rebuilt after each data refresh',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'metric': {'type': 'string'},
+                    'order': {'type': 'string'},
+                    'currency': {'type': 'string', 'description': 'Currency of prices, market caps and volumes'},
+                    'coins': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'coin_id': {'type': 'string'},
+                                'name': {'type': 'string'},
+                                'price': {'type': 'number'},
+                                'market_cap': {'type': 'number'},
+                                'volume': {'type': 'number'},
+                                'change_24h': {'type': 'number'},
+                                'change_7d': {'type': 'number'},
+                                'market_cap_change_24h': {'type': 'number'}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Unknown metric or invalid n or order',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {
+                        'type': 'string',
+                        'description': 'Error message'
+                    }
+                }
+            }
+        }
+    }
+})
+def top_coins():
+    req_args = request.args.to_dict()
+    coin_details = CoinDetails()
+    return coin_details.top_coins(req_args)
+
+
+@coinapp.get("/v1/coins/<coin_id>/history")
+@authenticate
+# Without an explicit end the window moves with the clock, so the response cannot be reused
+@cached_response(cacheable=lambda: bool(request.args.get("end")))
+@swag_from({
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'description': 'Bearer token for authentication',
+            'required': True,
+            'type': 'string'
+        },
+        {
+            'name': 'coin_id',
+            'in': 'path',
+            'description': 'Coin ID',
+            'required': True,
+            'type': 'string',
+            'example': 'bitcoin'
+        },
+        {
+            'name': 'start',
+            'in': 'query',
+            'description': 'Range start in epoch seconds; defaults to 24 hours before end',
+            'required': False,
+            'type': 'integer'
+        },
+        {
+            'name': 'end',
+            'in': 'query',
+            'description': 'Range end in epoch seconds, exclusive; defaults to now',
+            'required': False,
+            'type': 'integer'
+        },
+        {
+            'name': 'interval',
+            'in': 'query',
+            'description': 'Candle width in seconds; returns OHLC candles instead of raw points',
+            'required': False,
+            'type': 'integer',
+            'example': 3600
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Price points or OHLC candles recorded by data refreshes',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'coin_id': {'type': 'string', 'description': 'Coin ID'},
+                    'currency': {'type': 'string', 'description': 'Currency of prices and volumes'},
+                    'points': {
+                        'type': 'array',
+                        'description': 'Raw points, when no interval is given',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                't': {'type': 'integer', 'description': 'Epoch seconds'},
+                                'price': {'type': 'number'},
+                                'market_cap': {'type': 'number'},
+                                'volume': {'type': 'number'}
+                            }
+                        }
+                    },
+                    'candles': {
+                        'type': 'array',
+                        'description': 'OHLC candles, when an interval is given',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                't': {'type': 'integer', 'description': 'Candle start in epoch seconds'},
+                                'open': {'type': 'number'},
+                                'high': {'type': 'number'},
+                                'low': {'type': 'number'},
+                                'close': {'type': 'number'},
+                                'volume': {'type': 'number'},
+                                'points': {'type': 'integer', 'description': 'Number of points in the candle'}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid range or interval',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {
+                        'type': 'string',
+                        'description': 'Error message'
+                    }
+                }
+            }
+        }
+    }
+})
+def coin_history(coin_id):
+    req_args = request.args.to_dict()
+    coin_details = CoinDetails()
+    return coin_details.coin_history(coin_id, req_args)
+
+
 @coinapp.get("/v1/coins/categories")
 @authenticate
+@cached_response
 @swag_from({
     'responses': {
         200: {
@@ -298,7 +762,7 @@ def get_coins_list():
                 'properties': {
                     'categories': {
                         'type': 'array',
-                        'description': 'List of categories',
+                        'description': 'List of category names, or of {name, count} objects when counts is true',
                         'items': {
                             'type': 'string',
                             'description': 'A category name'
@@ -325,14 +789,163 @@ def get_coins_list():
             'required': True,
             'type': 'string'
         },
+        {
+            'name': 'counts',
+            'in': 'query',
+            'description': 'Include the number of coins in each category',
+            'required': False,
+            'type': 'boolean',
+            'example': True
+        },
     ]})
 def get_coin_categories():
+    req_args = request.args.to_dict()
+    coin_details = CoinDetails()
+    return coin_details.get_coin_categories(req_args)
+
+
+@coinapp.get("/v1/coins/categories/<category>")
+@authenticate
+@cached_response
+@swag_from({
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'description': 'Bearer token for authentication',
+            'required': True,
+            'type': 'string'
+        },
+        {
+            'name': 'category',
+            'in': 'path',
+            'description': 'Category name',
+            'required': True,
+            'type': 'string',
+            'example': 'Masternodes'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'The coins in a category',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'category': {'type': 'string', 'description': 'Category name'},
+                    'count': {'type': 'integer', 'description': 'Number of coins in the category'},
+                    'coin_ids': {
+                        'type': 'array',
+                        'description': 'Ids of the coins in the category',
+                        'items': {'type': 'string'}
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Bad Request',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'description': 'Error message'}
+                }
+            }
+        }
+    }
+})
+def get_category_coins(category):
+    coin_details = CoinDetails()
+    return coin_details.get_category_coins(category)
+
+
+@coinapp.post("/v1/coins/lookup")
+@authenticate
+@swag_from({
+    'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'description': 'Bearer token for authentication',
+            'required': True,
+            'type': 'string'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'description': 'Coin ids to look up. Concurrent lookups are batched into one query.',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'coin_ids': {
+                        'type': 'array',
+                        'description': 'Ids of the coins, at most [batch] max_ids of them',
+                        'items': {'type': 'string'},
+                        'example': ['bitcoin', 'ethereum']
+                    },
+                    'vs_currency': {
+                        'type': 'string',
+                        'description': 'Currency of the returned current_price_<currency>, defaults to cad. '
+                                       'CAD is the stored CoinGecko price; any other currency is the stored USD '
+                                       'price times the cached exchange rate and may differ from CoinGecko\'s '
+                                       'own price in that currency',
+                        'example': 'eur'
+                    }
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'The coins in the order of coin_ids',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'coins': {
+                        'type': 'array',
+                        'description': 'One entry per requested id; null when the id is unknown',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'coin_id': {'type': 'string', 'description': 'Unique identifier for the coin'},
+                                'name': {'type': 'string', 'description': 'Name of the coin'},
+                                'categories': {
+                                    'type': 'array',
+                                    'description': 'List of categories associated with the coin',
+                                    'items': {'type': 'string'}
+                                },
+                                'current_price_cad': {
+                                    'type': 'number',
+                                    'description': 'Current price of the coin in CAD',
+                                    'format': 'float'
+                                }
+                            }
+                        }
+                    },
+                    'missing': {
+                        'type': 'array',
+                        'description': 'Requested ids with no coin',
+                        'items': {'type': 'string'}
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'coin_ids is missing, malformed or too long, or vs_currency is unsupported'
+        },
+        503: {
+            'description': 'Exchange rates are unavailable'
+        }
+    }
+})
+def lookup_coins():
+    req_body = json.loads(request.get_data())
     coin_details = CoinDetails()
-    return coin_details.get_coin_categories()
+    return coin_details.lookup_coins(req_body)
 
 
 @coinapp.post("/v1/specific_coins")
 @authenticate
+@cached_response(variant=fx_cache_variant)
 @swag_from({
     'parameters': [
         {
@@ -374,6 +987,23 @@ def get_coin_categories():
                         'type': 'integer',
                         'description': 'Number of items per page',
                         'example': 10
+                    },
+                    'cursor': {
+                        'type': 'string',
+                        'description': 'Opaque token from next_cursor; pass it empty for the first page. '
+                                       'Switches to cursor pagination ordered on coin_id'
+                    },
+                    'include_total': {
+                        'type': 'boolean',
+                        'description': 'Include the total match count in cursor pagination responses'
+                    },
+                    'vs_currency': {
+                        'type': 'string',
+                        'description': 'Currency of the returned current_price_<currency>, defaults to cad. '
+                                       'CAD is the stored CoinGecko price; any other currency is the stored USD '
+                                       'price times the cached exchange rate and may differ from CoinGecko\'s '
+                                       'own price in that currency',
+                        'example': 'eur'
                     }
                 }
             }
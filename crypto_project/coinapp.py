@@ -4,6 +4,11 @@ from flask_restful import Api
 from oslo_config import cfg
 
 from common.config import startup_sanity_checks
+from common.mongo_adapter import DatabaseAdapter
+from crypto_project.api.common.fx import get_fx_rates
+from crypto_project.api.common.utils import ensure_indexes
+from crypto_project.api.v1.actions import CoinDetails
+from crypto_project.api.v1.actions import refresh_scheduler
 from crypto_project.api.v1.route import authapp
 from crypto_project.api.v1.route import coinapp
 
@@ -12,6 +17,14 @@ api = Api(app)
 swagger = Swagger(app)
 app.register_blueprint(coinapp)
 app.register_blueprint(authapp)
-cfg.CONF(project='myproject', version='v1', prog='myproj-api')
-startup_sanity_checks()
-app.run("0.0.0.0", 5000)
+# Spawned password hashing workers import this module as __mp_main__; only the
+# real entrypoint may start the background threads and the server
+if __name__ == "__main__":
+    cfg.CONF(project='myproject', version='v1', prog='myproj-api')
+    startup_sanity_checks()
+    DatabaseAdapter().bootstrap_collections([cfg.CONF.database.collection_name, "user"])
+    ensure_indexes()
+    CoinDetails().materialize_categories()
+    refresh_scheduler.start(cfg.CONF.refresh.schedule_interval)
+    get_fx_rates().start()
+    app.run("0.0.0.0", 5000)
@@ -0,0 +1,98 @@
+"""Authentication overhead of a protected endpoint with and without the
+verified-token cache.
+
+Each MongoDB command is delayed by a simulated network round trip, so the
+numbers reflect what the user lookup costs against a remote server.
+
+    python -m tests.benchmarks.bench_auth [--requests 2000] [--rtt-ms 0.5]
+"""
+import argparse
+import datetime
+import time
+
+import jwt
+import mongomock
+from flask import Flask
+from oslo_config import cfg
+
+import common.config  # noqa: F401 registers the oslo options used by the adapter
+from common import mongo_adapter
+from crypto_project.api.common.utils import RestResponses
+from crypto_project.api.common.utils import authenticate
+from crypto_project.api.common.utils import get_token_cache
+
+
+class _SlowCollection(object):
+    def __init__(self, target, rtt, counter):
+        self._target = target
+        self._rtt = rtt
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def command(*args, **kwargs):
+            self._counter.append(name)
+            time.sleep(self._rtt)
+            return attr(*args, **kwargs)
+        return command
+
+
+class _SlowDatabase(_SlowCollection):
+    def __getitem__(self, name):
+        return _SlowCollection(self._target[name], self._rtt, self._counter)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    client = mongomock.MongoClient()
+    client.crypto_db.user.insert_one({"username": "allwin", "status": "active"})
+    commands = []
+
+    class SlowClient(object):
+        def get_database(self, name):
+            return _SlowDatabase(client[name], args.rtt_ms / 1000, commands)
+
+        def close(self):
+            pass
+
+    mongo_adapter.MongoClient = lambda uri, **kwargs: SlowClient()
+    cfg.CONF.set_override("JWT_SECRET_KEY", "benchmark-secret-key-of-sufficient-length", group="token")
+    token = jwt.encode({"username": "allwin", "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                       cfg.CONF.token.JWT_SECRET_KEY, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    app = Flask("bench")
+
+    @app.get("/protected")
+    @authenticate
+    def protected():
+        return RestResponses.success("ok")
+
+    def run(use_cache: bool):
+        test_client = app.test_client()
+        get_token_cache().clear()
+        test_client.get("/protected", headers=headers)
+        commands.clear()
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            if not use_cache:
+                get_token_cache().clear()
+            test_client.get("/protected", headers=headers)
+        elapsed = time.perf_counter() - start
+        return elapsed / args.requests * 1000, len(commands) / args.requests
+
+    print(f"{args.requests} requests, simulated round trip {args.rtt_ms} ms")
+    for label, use_cache in (("without cache", False), ("with cache", True)):
+        ms, db_calls = run(use_cache)
+        print(f"{label:>14}: {ms:.3f} ms/request, {db_calls:.2f} DB calls/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Read latency of /v1/coins/categories while a login storm is running,
+with password hashing inline in the request thread versus on the bounded
+hashing pool.
+
+    python -m tests.benchmarks.bench_login_storm [--storm-threads 16] [--reads 200]
+"""
+import argparse
+import datetime
+import logging
+import statistics
+import threading
+import time
+
+import jwt
+import mongomock
+import requests
+from flask import Flask
+from oslo_config import cfg
+from werkzeug.serving import make_server
+
+import common.config  # noqa: F401 registers the oslo options used by the adapter
+from common import mongo_adapter
+from crypto_project.api.common import hashing
+from crypto_project.api.common.hashing import PasswordHasher
+from crypto_project.api.v1.route import authapp
+from crypto_project.api.v1.route import coinapp
+
+
+def run(base_url, headers, storm_threads, reads):
+    stop = threading.Event()
+    logins = {"ok": 0, "unavailable": 0}
+
+    def storm():
+        session = requests.Session()
+        while not stop.is_set():
+            response = session.post(f"{base_url}/v1/auth/login",
+                                    json={"username": "storm", "password": "Secure@123"})
+            if response.status_code == 503:
+                logins["unavailable"] += 1
+                # Well-behaved clients back off as told by the 503
+                stop.wait(float(response.headers["Retry-After"]))
+            else:
+                logins["ok"] += 1
+
+    workers = [threading.Thread(target=storm, daemon=True) for _ in range(storm_threads)]
+    for worker in workers:
+        worker.start()
+    time.sleep(1)
+
+    session = requests.Session()
+    latencies = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        session.get(f"{base_url}/v1/coins/categories", headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    latencies.sort()
+    return (statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], logins)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storm-threads", type=int, default=16)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    client = mongomock.MongoClient()
+    mongo_adapter.MongoClient = lambda uri, **kwargs: client
+    cfg.CONF.set_override("JWT_SECRET_KEY", "benchmark-secret-key-of-sufficient-length", group="token")
+    method = cfg.CONF.password.method
+    client.crypto_db.user.insert_many([
+        {"username": "reader", "status": "active"},
+        {"username": "storm", "status": "active",
+         "password": PasswordHasher(method=method, salt_length=16, max_workers=0, max_queue=0,
+                                    timeout=30).hash("Secure@123")},
+    ])
+    client.crypto_db.coin_details.insert_many([{"coin_id": f"coin{i}", "categories": [f"category{i % 40}"]}
+                                               for i in range(2000)])
+    token = jwt.encode({"username": "reader", "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                       cfg.CONF.token.JWT_SECRET_KEY, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app = Flask("bench")
+    app.register_blueprint(coinapp)
+    app.register_blueprint(authapp)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"{args.storm_threads} login threads, {args.reads} reads, hash method {method}")
+    p50, p99, _ = run(base_url, headers, 0, args.reads)
+    print(f"{'idle':>6}: read p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+    for label, max_workers in (("inline", 0), ("pool", cfg.CONF.password.max_workers)):
+        hashing._hasher = PasswordHasher(method=method, salt_length=16, max_workers=max_workers,
+                                         max_queue=cfg.CONF.password.max_queue, timeout=30)
+        if max_workers:
+            hashing._hasher.hash("warm up the worker processes")
+        p50, p99, logins = run(base_url, headers, args.storm_threads, args.reads)
+        print(f"{label:>6}: read p50 {p50:.1f} ms, p99 {p99:.1f} ms; "
+              f"logins ok {logins['ok']}, 503 {logins['unavailable']}")
+        hashing._hasher.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
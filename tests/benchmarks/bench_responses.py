@@ -0,0 +1,48 @@
+"""Bytes and milliseconds per specific_coins page for each JSON backend and
+content coding.
+
+    python -m tests.benchmarks.bench_responses [--coins 5000] [--responses 50]
+"""
+import argparse
+import time
+
+from flask import Flask
+from oslo_config import cfg
+
+import common.config  # noqa: F401 registers the oslo options used by the serializers
+from crypto_project.api.common import serialization
+from crypto_project.api.common.utils import RestResponses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--coins", type=int, default=5000)
+    parser.add_argument("--responses", type=int, default=50)
+    args = parser.parse_args()
+
+    page = [{"coin_id": f"coin-{i:06d}",
+             "name": f"Coin number {i}",
+             "categories": ["Masternodes", "Layer 1 (L1)", "Proof of Work (PoW)"][:i % 3 + 1],
+             "current_price_cad": i * 1.0371} for i in range(args.coins)]
+    app = Flask("bench")
+    backends = ["stdlib"] + (["orjson"] if serialization.orjson else [])
+    encodings = [None] + serialization.available_encodings()
+
+    print(f"{args.coins} coins per response, {args.responses} responses")
+    for backend in backends:
+        cfg.CONF.set_override("json_backend", backend, group="response")
+        serialization._serializer = None
+        for encoding in encodings:
+            headers = {"Accept-Encoding": encoding} if encoding else {}
+            with app.test_request_context(headers=headers):
+                start = time.perf_counter()
+                for _ in range(args.responses):
+                    response = RestResponses.success("Coins details fetched successfull", data=page)
+                elapsed = time.perf_counter() - start
+            size = len(response.get_data())
+            print(f"{backend:>7} {encoding or 'identity':>8}: {elapsed / args.responses * 1000:8.2f} ms/response, "
+                  f"{size:>9} bytes")
+
+
+if __name__ == "__main__":
+    main()
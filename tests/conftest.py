@@ -0,0 +1,200 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import mongomock
+import pytest
+from oslo_config import cfg
+
+import common.config  # noqa: F401 registers the oslo options used by the adapter
+from common import mongo_adapter
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """Back every DatabaseAdapter with one in-memory mongomock client."""
+    client = mongomock.MongoClient()
+    created = []
+
+    def fake_client(uri, **kwargs):
+        created.append((uri, kwargs))
+        return client
+
+    mongo_adapter.close_clients()
+    monkeypatch.setattr(mongo_adapter, "MongoClient", fake_client)
+    client.created = created
+    yield client
+    mongo_adapter.close_clients()
+
+
+class _CommandCounter:
+    """Proxy over a mongomock object that records each call which would be a
+    server round trip against a real mongod."""
+
+    COMMANDS = {
+        "list_collection_names", "create_collection", "find_one", "find", "aggregate",
+        "count_documents", "estimated_document_count", "distinct", "insert_one",
+        "insert_many", "update_one", "update_many", "bulk_write", "create_index",
+        "delete_one", "delete_many", "find_one_and_update", "replace_one",
+        "create_indexes", "index_information",
+    }
+
+    def __init__(self, target, commands):
+        self._target = target
+        self._commands = commands
+
+    def __getitem__(self, name):
+        return _CommandCounter(self._target[name], self._commands)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name == "get_database":
+            return lambda *args, **kwargs: _CommandCounter(attr(*args, **kwargs), self._commands)
+        if name in self.COMMANDS:
+            def command(*args, **kwargs):
+                self._commands.append(name)
+                return attr(*args, **kwargs)
+            return command
+        return attr
+
+
+@pytest.fixture
+def server_commands(mongo_client, monkeypatch):
+    """List of server commands issued through DatabaseAdapter in the test."""
+    commands = []
+    counting_client = _CommandCounter(mongo_client, commands)
+    monkeypatch.setattr(mongo_adapter, "MongoClient", lambda uri, **kwargs: counting_client)
+    return commands
+
+
+class CoinGeckoStub(ThreadingHTTPServer):
+    """Local HTTP server replaying the CoinGecko coins list and coin shapes.
+
+    ``rate_limited`` maps a coin id to the number of 429 responses it should
+    return before succeeding; ``requests`` records every path served.
+    ``fx_rates`` are the USD exchange rates served to the FX rate cache.
+    """
+
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, coins: list[dict]):
+        super().__init__(("127.0.0.1", 0), _CoinGeckoHandler)
+        self.coins = dict((coin["id"], coin) for coin in coins)
+        self.rate_limited = {}
+        self.fx_rates = {"USD": 1.0, "CAD": 1.4, "EUR": 0.9}
+        self.requests = []
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}/api/v3"
+
+
+class _CoinGeckoHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        stub = self.server
+        stub.requests.append(self.path)
+        if self.path == "/api/v3/coins/list":
+            coins_list = [{"id": coin_id, "symbol": coin["symbol"], "name": coin["name"]}
+                          for coin_id, coin in stub.coins.items()]
+            return self._reply(200, coins_list)
+        if self.path == "/fx/latest/USD":
+            return self._reply(200, {"base": "USD", "rates": stub.fx_rates})
+
+        coin_id = self.path.rsplit("/", 1)[-1]
+        if stub.rate_limited.get(coin_id):
+            stub.rate_limited[coin_id] -= 1
+            return self._reply(429, {"status": {"error_code": 429}}, {"Retry-After": "0"})
+        if coin_id not in stub.coins:
+            return self._reply(404, {"error": "coin not found"})
+        return self._reply(200, stub.coins[coin_id])
+
+
+def make_coin(coin_id, /, *, categories=None, cad=1.0):
+    return {
+        "id": coin_id,
+        "symbol": coin_id[:3],
+        "name": coin_id.title(),
+        "categories": categories or ["Masternodes"],
+        "market_data": {"current_price": {"cad": cad, "usd": cad * 0.7}},
+    }
+
+
+@pytest.fixture
+def coingecko_stub(monkeypatch):
+    from crypto_project.api.common import fx
+    from crypto_project.api.common.definitions import Urls
+
+    stub = CoinGeckoStub([make_coin(f"coin{i:03d}", cad=float(i)) for i in range(50)])
+    thread = threading.Thread(target=stub.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    monkeypatch.setattr(Urls, "COINS_LIST_URL", f"{stub.base_url}/coins/list")
+    monkeypatch.setattr(Urls, "COIN_ID_URL", f"{stub.base_url}/coins/{{}}")
+    monkeypatch.setattr(Urls, "FX_RATES_URL", f"http://127.0.0.1:{stub.server_address[1]}/fx/latest/USD")
+    monkeypatch.setattr(fx, "_fx_rates", None)
+    cfg.CONF.set_override("requests_per_minute", 60000, group="coingecko")
+    cfg.CONF.set_override("burst", 50, group="coingecko")
+    cfg.CONF.set_override("backoff_base", 0.01, group="coingecko")
+    yield stub
+    cfg.CONF.clear_override("requests_per_minute", group="coingecko")
+    cfg.CONF.clear_override("burst", group="coingecko")
+    cfg.CONF.clear_override("backoff_base", group="coingecko")
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture
+def api_client(mongo_client):
+    """Flask test client serving the API blueprints against mongomock."""
+    from flask import Flask
+
+    from crypto_project.api.common import search
+    from crypto_project.api.common import snapshot
+    from crypto_project.api.common.response_cache import get_response_cache
+    from crypto_project.api.common.utils import get_count_cache
+    from crypto_project.api.common.utils import get_token_cache
+    from crypto_project.api.v1.route import authapp
+    from crypto_project.api.v1.route import coinapp
+
+    app = Flask("CryptoCurrencyTest")
+    app.register_blueprint(coinapp)
+    app.register_blueprint(authapp)
+    app.testing = True
+    cfg.CONF.set_override("JWT_SECRET_KEY", "test-secret-key-of-sufficient-length", group="token")
+    get_token_cache().clear()
+    get_count_cache().clear()
+    get_response_cache().clear()
+    snapshot._snapshot = None
+    search._index = None
+    with app.test_client() as client:
+        yield client
+    get_token_cache().clear()
+    get_count_cache().clear()
+    get_response_cache().clear()
+    cfg.CONF.clear_override("JWT_SECRET_KEY", group="token")
+
+
+@pytest.fixture
+def auth_headers(api_client, mongo_client):
+    """Authorization header of an active user."""
+    import datetime
+
+    import jwt
+
+    mongo_client.crypto_db.user.insert_one({"username": "allwin", "email": "allwin@example.com",
+                                            "status": "active"})
+    token = jwt.encode({"username": "allwin",
+                        "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                       cfg.CONF.token.JWT_SECRET_KEY, algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,90 @@
+import time
+
+from common.mongo_adapter import DatabaseAdapter
+from crypto_project.api.common import hashing
+from crypto_project.api.common.hashing import PasswordHasher
+from crypto_project.api.common.utils import TokenCache
+from crypto_project.api.common.utils import ensure_indexes
+
+
+def test_protected_route_skips_user_lookup_once_token_is_cached(api_client, auth_headers, server_commands):
+    assert api_client.get("/v1/coins/categories", headers=auth_headers).status_code == 200
+    first_request = server_commands.count("find_one")
+    server_commands.clear()
+
+    for _ in range(10):
+        assert api_client.get("/v1/coins/categories", headers=auth_headers).status_code == 200
+
+    assert first_request == 1
+    assert "find_one" not in server_commands
+
+
+def test_deactivated_user_is_rejected_immediately(api_client, auth_headers):
+    assert api_client.get("/v1/coins/categories", headers=auth_headers).status_code == 200
+
+    response = api_client.post("/v1/auth/deactivate", headers=auth_headers)
+
+    assert response.status_code == 200
+    response = api_client.get("/v1/coins/categories", headers=auth_headers)
+    assert response.status_code == 401
+    assert response.json["message"] == "User is not active"
+
+
+def test_signup_rejects_a_taken_username_with_another_email(api_client, mongo_client, monkeypatch):
+    monkeypatch.setattr(hashing, "_hasher", PasswordHasher(method="pbkdf2:sha256:1000", salt_length=16,
+                                                           max_workers=0, max_queue=0, timeout=30))
+    ensure_indexes()
+    signup = {"username": "allwin", "email": "allwin@example.com", "password": "Secure@123"}
+    assert api_client.post("/v1/signup", json=signup).status_code == 200
+    signup["email"] = "other@example.com"
+
+    response = api_client.post("/v1/signup", json=signup)
+    assert response.status_code == 400
+    assert response.json["message"] == "User already Exists"
+
+    # A concurrent signup that passed the lookup is stopped by the unique index
+    monkeypatch.setattr(DatabaseAdapter, "find_document", lambda self, query: None)
+    response = api_client.post("/v1/signup", json=signup)
+    assert response.status_code == 400
+    assert response.json["message"] == "User already Exists"
+
+
+def test_invalid_token_is_not_cached(api_client):
+    headers = {"Authorization": "Bearer not-a-jwt"}
+    for _ in range(2):
+        response = api_client.get("/v1/coins/categories", headers=headers)
+        assert response.status_code == 401
+        assert response.json["message"] == "Invalid token"
+
+
+def test_token_cache_entry_never_outlives_token_expiry():
+    cache = TokenCache(10, 60)
+    cache.put("short-lived", "allwin", time.time() + 0.05)
+    cache.put("long-lived", "allwin", time.time() + 3600)
+
+    assert cache.get("short-lived") == "allwin"
+    time.sleep(0.06)
+    assert cache.get("short-lived") is None
+    assert cache.get("long-lived") == "allwin"
+
+
+def test_token_cache_is_bounded():
+    cache = TokenCache(2, 60)
+    for i in range(3):
+        cache.put(f"token{i}", f"user{i}", time.time() + 3600)
+
+    assert cache.get("token0") is None
+    assert cache.get("token2") == "user2"
+
+
+def test_invalidate_user_drops_live_tokens_after_evictions():
+    cache = TokenCache(3, 60)
+    cache.put("a1", "allwin", time.time() + 3600)
+    for i in range(3):
+        cache.put(f"other{i}", f"user{i}", time.time() + 3600)
+    cache.put("a2", "allwin", time.time() + 3600)
+
+    cache.invalidate_user("allwin")
+
+    assert cache.get("a2") is None
+    assert cache.get("other2") == "user2"
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from crypto_project.api.common.batching import LookupCoalescer
+from crypto_project.api.v1.actions import coin_lookup
+
+COINS = [
+    {"coin_id": coin_id, "name": coin_id.title(), "categories": ["Masternodes"],
+     "market_data": {"current_price": {"cad": 1.4, "usd": 1.0}}}
+    for coin_id in ("bitcoin", "ethereum", "solana")
+]
+
+
+def run_concurrently(calls):
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+
+    def run(index, call):
+        barrier.wait()
+        results[index] = call()
+
+    threads = [threading.Thread(target=run, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+def test_concurrent_lookups_share_one_fetch():
+    fetches = []
+
+    def fetch(ids):
+        fetches.append(ids)
+        return dict((coin_id, {"coin_id": coin_id}) for coin_id in ids if coin_id != "unknown")
+
+    coalescer = LookupCoalescer(fetch, window=0.2, max_batch=100)
+    requests = [["a", "b"], ["b", "c"], ["c", "unknown"], ["a"]]
+
+    results = run_concurrently([lambda ids=ids: coalescer.get_many(ids) for ids in requests])
+
+    assert fetches == [["a", "b", "c", "unknown"]]
+    assert all(set(result) == {"a", "b", "c"} for result in results)
+    assert coalescer.stats() == {"requests": 4, "batches": 1, "ids_requested": 7, "ids_fetched": 4}
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    def fetch(ids):
+        raise RuntimeError("database down")
+
+    coalescer = LookupCoalescer(fetch, window=0.2, max_batch=100)
+    results = run_concurrently([lambda ids=ids: pytest.raises(RuntimeError, coalescer.get_many, ids)
+                                for ids in (["a", "b"], ["c"])])
+
+    assert all(str(result.value) == "database down" for result in results)
+    assert coalescer.stats()["batches"] == 1
+
+
+def test_full_batch_is_closed_early():
+    fetches = []
+
+    def fetch(ids):
+        fetches.append(ids)
+        return {}
+
+    coalescer = LookupCoalescer(fetch, window=0.2, max_batch=2)
+    first = threading.Thread(target=coalescer.get_many, args=(["a", "b"],))
+    first.start()
+    time.sleep(0.05)
+    coalescer.get_many(["c"])
+    first.join(10)
+
+    assert sorted(fetches) == [["a", "b"], ["c"]]
+
+
+def test_lookup_endpoint_keeps_request_order(api_client, auth_headers, coingecko_stub, server_commands,
+                                             mongo_client, monkeypatch):
+    mongo_client.crypto_db.coin_details.insert_many([dict(coin) for coin in COINS])
+    monkeypatch.setattr(coin_lookup, "window", 0.2)
+    bodies = [{"coin_ids": ["solana", "nope", "bitcoin", "solana"]},
+              {"coin_ids": ["ethereum", "bitcoin"], "vs_currency": "eur"}]
+    server_commands.clear()
+
+    # A test client holds one request context at a time, so each thread gets its own
+    clients = [api_client.application.test_client() for _ in bodies]
+    responses = run_concurrently([lambda client=client, body=body: client.post("/v1/coins/lookup", json=body,
+                                                                               headers=auth_headers)
+                                  for client, body in zip(clients, bodies)])
+
+    assert server_commands.count("aggregate") == 1
+    first, second = (response.json["data"] for response in responses)
+    assert [coin and coin["coin_id"] for coin in first["coins"]] == ["solana", None, "bitcoin", "solana"]
+    assert first["coins"][0]["current_price_cad"] == 1.4
+    assert first["missing"] == ["nope"]
+    assert [coin["coin_id"] for coin in second["coins"]] == ["ethereum", "bitcoin"]
+    assert second["coins"][0]["current_price_eur"] == 0.9
+    assert api_client.post("/v1/coins/lookup", json={"coin_ids": []}, headers=auth_headers).status_code == 400
+    assert api_client.post("/v1/coins/lookup", json={"coin_ids": ["bitcoin"], "vs_currency": "xyz"},
+                           headers=auth_headers).status_code == 400
@@ -0,0 +1,121 @@
+from crypto_project.api.v1.actions import CoinDetails
+from crypto_project.api.v1.actions import refresh_scheduler
+
+COIN = {
+    "coin_id": "01coin",
+    "market_data": {"current_price": {"cad": 0.00028195}},
+    "name": "01coin",
+    "categories": ["Masternodes"]
+}
+
+
+def test_categories_are_served_from_materialized_collection(api_client, auth_headers, mongo_client,
+                                                            server_commands):
+    mongo_client.crypto_db.coin_details.insert_one(dict(COIN))
+    CoinDetails().materialize_categories()
+    CoinDetails().materialize_categories()
+    assert server_commands.count("aggregate") == 1
+    server_commands.clear()
+
+    response = api_client.get("/v1/coins/categories", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json == {
+        "data": {"categories": ["Masternodes"]},
+        "message": "Categories retrieved Successfully",
+        "status": "success"
+    }
+    assert mongo_client.crypto_db.categories.find_one({"_id": "Masternodes"})["coin_ids"] == ["01coin"]
+    assert "aggregate" not in server_commands
+
+
+def test_refresh_maintains_category_counts(api_client, auth_headers, coingecko_stub, mongo_client):
+    coingecko_stub.coins["coin001"]["categories"] = ["Masternodes", "Layer 1 (L1)"]
+    api_client.get("/v1/data_refresh")
+    assert refresh_scheduler.wait(10)
+
+    response = api_client.get("/v1/coins/categories?counts=true", headers=auth_headers)
+    assert response.json["data"]["categories"] == [{"name": "Layer 1 (L1)", "count": 1},
+                                                   {"name": "Masternodes", "count": 50}]
+
+    response = api_client.get("/v1/coins/categories/Layer 1 (L1)", headers=auth_headers)
+    assert response.json["data"] == {"category": "Layer 1 (L1)", "count": 1, "coin_ids": ["coin001"]}
+    assert api_client.get("/v1/coins/categories/Unknown", headers=auth_headers).status_code == 400
+
+
+def test_cursor_pagination_walks_coins_in_coin_id_order(api_client, auth_headers, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many(
+        [dict(COIN, coin_id=f"coin{i:03d}", name=f"Coin {i}", symbol=f"c{i}") for i in (4, 0, 3, 1, 2)])
+
+    seen, cursor = [], ""
+    while cursor is not None:
+        response = api_client.get(f"/v1/coins?limit=2&cursor={cursor}", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json["data"]
+        assert "total" not in data
+        seen.extend(coin["coin_id"] for coin in data["coins"])
+        cursor = data["next_cursor"]
+
+    assert seen == [f"coin{i:03d}" for i in range(5)]
+    response = api_client.get("/v1/coins?limit=2&cursor=&include_total=true", headers=auth_headers)
+    assert response.json["data"]["total"] == 5
+    assert api_client.get("/v1/coins?cursor=not-a-cursor", headers=auth_headers).status_code == 400
+    for limit in (0, -2, 501, "x"):
+        assert api_client.get(f"/v1/coins?cursor=&limit={limit}", headers=auth_headers).status_code == 400
+    body = {"filters": {"categories": ["Masternodes"]}, "cursor": "", "limit": 0}
+    assert api_client.post("/v1/specific_coins", json=body, headers=auth_headers).status_code == 400
+
+
+def test_specific_coins_cursor_pagination_keeps_filters(api_client, auth_headers, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many(
+        [dict(COIN, coin_id=f"coin{i:03d}", categories=["Masternodes" if i % 2 else "Other"]) for i in range(6)])
+    body = {"filters": {"categories": ["Masternodes"]}, "limit": 2, "cursor": ""}
+
+    response = api_client.post("/v1/specific_coins", json=body, headers=auth_headers)
+    first = response.json["data"]
+    assert [coin["coin_id"] for coin in first["coins"]] == ["coin001", "coin003"]
+
+    body["cursor"] = first["next_cursor"]
+    second = api_client.post("/v1/specific_coins", json=body, headers=auth_headers).json["data"]
+    assert [coin["coin_id"] for coin in second["coins"]] == ["coin005"]
+    assert second["next_cursor"] is None
+
+    del body["cursor"]
+    legacy = api_client.post("/v1/specific_coins", json=body, headers=auth_headers).json["data"]
+    assert isinstance(legacy, list) and len(legacy) == 2
+
+
+def test_counts_are_cached_until_refresh(api_client, auth_headers, coingecko_stub, server_commands, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many([dict(COIN, coin_id=f"local{i:03d}") for i in range(3)])
+    body = {"filters": {"categories": ["Masternodes", "Masternodes"]}, "page": 1, "limit": 2}
+
+    for _ in range(3):
+        assert api_client.get("/v1/coins?page=1&limit=2", headers=auth_headers).json["data"]["total"] == 3
+        assert len(api_client.post("/v1/specific_coins", json=body, headers=auth_headers).json["data"]) == 2
+    body["filters"]["categories"] = ["Masternodes"]
+    api_client.post("/v1/specific_coins", json=body, headers=auth_headers)
+    assert server_commands.count("estimated_document_count") == 1
+    assert server_commands.count("count_documents") == 1
+
+    api_client.get("/v1/data_refresh")
+    assert refresh_scheduler.wait(10)
+    response = api_client.get("/v1/coins?page=1&limit=2", headers=auth_headers)
+    assert response.json["data"]["total"] == 3 + len(coingecko_stub.coins)
+
+
+def test_specific_coins_filters_unpriced_coins_before_paginating(api_client, auth_headers, mongo_client):
+    coins = [dict(COIN, coin_id=f"coin{i:03d}", description={"en": "x" * 1000}) for i in range(5)]
+    coins[0]["market_data"] = {"current_price": {}}
+    del coins[2]["market_data"]
+    mongo_client.crypto_db.coin_details.insert_many(coins)
+    body = {"filters": {"categories": ["Masternodes"]}, "page": 1, "limit": 2}
+
+    response = api_client.post("/v1/specific_coins", json=body, headers=auth_headers)
+
+    assert response.json["data"] == [
+        {"coin_id": "coin001", "name": "01coin", "categories": ["Masternodes"], "current_price_cad": 0.00028195},
+        {"coin_id": "coin003", "name": "01coin", "categories": ["Masternodes"], "current_price_cad": 0.00028195},
+    ]
+    body["page"] = 2
+    response = api_client.post("/v1/specific_coins", json=body, headers=auth_headers)
+    assert [coin["coin_id"] for coin in response.json["data"]] == ["coin004"]
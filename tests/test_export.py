@@ -0,0 +1,30 @@
+import json
+
+COINS = [{"coin_id": f"coin{i:03d}", "name": f"Coin {i}", "symbol": f"c{i}",
+          "market_data": {"current_price": {"usd": float(i), "cad": i * 1.4}}} for i in (3, 0, 2, 1)]
+
+
+def test_export_streams_ndjson_in_coin_id_order(api_client, auth_headers, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many([dict(coin) for coin in COINS])
+
+    response = api_client.get("/v1/coins/export?fields=coin_id,market_data.current_price.usd", headers=auth_headers)
+
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    lines = [json.loads(line) for line in response.data.splitlines()]
+    assert lines == [{"coin_id": f"coin{i:03d}", "market_data": {"current_price": {"usd": float(i)}}} for i in range(4)]
+
+
+def test_export_as_json_array(api_client, auth_headers, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many([dict(coin) for coin in COINS])
+
+    response = api_client.get("/v1/coins/export?format=json", headers=auth_headers)
+
+    assert response.json == [{"coin_id": f"coin{i:03d}", "name": f"Coin {i}", "symbol": f"c{i}"} for i in range(4)]
+
+
+def test_export_rejects_unknown_fields_and_anonymous_clients(api_client, auth_headers):
+    assert api_client.get("/v1/coins/export?format=json", headers=auth_headers).json == []
+    assert api_client.get("/v1/coins/export?fields=coin_id,_id", headers=auth_headers).status_code == 400
+    assert api_client.get("/v1/coins/export?format=csv", headers=auth_headers).status_code == 400
+    assert api_client.get("/v1/coins/export").status_code == 401
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from crypto_project.api.common.fx import FXRateCache
+from crypto_project.api.common.fx import FXRatesUnavailable
+from crypto_project.api.common.fx import convert_prices
+from crypto_project.api.common.fx import get_fx_rates
+from crypto_project.api.common.response_cache import get_response_cache
+
+
+def test_convert_prices_multiplies_the_whole_page():
+    coins = [{"coin_id": "a", "price_usd": 2.0}, {"coin_id": "b", "price_usd": None}, {"coin_id": "c"}]
+
+    convert_prices(coins, 1.5, source="price_usd", target="current_price_eur")
+
+    assert coins == [{"coin_id": "a", "current_price_eur": 3.0},
+                     {"coin_id": "b", "current_price_eur": None},
+                     {"coin_id": "c", "current_price_eur": None}]
+
+
+def test_rates_are_cached_for_their_ttl(coingecko_stub):
+    rates = FXRateCache(ttl=3600)
+    assert rates.version() is None
+
+    assert rates.rate("eur") == 0.9
+    assert rates.rate("CAD") == 1.4
+    assert coingecko_stub.requests.count("/fx/latest/USD") == 1
+    with pytest.raises(ValueError):
+        rates.rate("xyz")
+
+    version = rates.version()
+    assert not rates.refresh() and rates.version() == version
+
+    coingecko_stub.fx_rates["EUR"] = 0.95
+    assert rates.refresh() and rates.version()[0] != version[0]
+    assert rates.rate("eur") == 0.95
+
+
+def test_failed_fetch_keeps_the_last_known_rates(coingecko_stub):
+    rates = FXRateCache(ttl=0)
+    assert rates.rate("eur") == 0.9
+
+    rates.url = "http://127.0.0.1:1/unreachable"
+    assert not rates.refresh()
+    assert rates.rate("eur") == 0.9
+
+    with pytest.raises(FXRatesUnavailable):
+        FXRateCache(url="http://127.0.0.1:1/unreachable", timeout=0.5).rates()
+
+
+def test_specific_coins_in_another_currency(api_client, auth_headers, coingecko_stub, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many([
+        {"coin_id": "a", "name": "A", "categories": ["Masternodes"],
+         "market_data": {"current_price": {"usd": 10.0, "cad": 14.0}}},
+        {"coin_id": "b", "name": "B", "categories": ["Masternodes"],
+         "market_data": {"current_price": {"cad": 2.0}}},
+    ])
+    body = {"filters": {"categories": ["Masternodes"]}, "vs_currency": "EUR"}
+
+    response = api_client.post("/v1/specific_coins", json=body, headers=auth_headers)
+
+    assert response.json["data"] == [
+        {"coin_id": "a", "name": "A", "categories": ["Masternodes"], "current_price_eur": 9.0},
+        {"coin_id": "b", "name": "B", "categories": ["Masternodes"], "current_price_eur": None},
+    ]
+    body["vs_currency"] = "xyz"
+    assert api_client.post("/v1/specific_coins", json=body, headers=auth_headers).status_code == 400
+    del body["vs_currency"]
+    default = api_client.post("/v1/specific_coins", json=body, headers=auth_headers).json["data"]
+    assert [coin["current_price_cad"] for coin in default] == [14.0, 2.0]
+
+
+def test_rate_change_reprices_cached_responses_without_a_new_generation(api_client, auth_headers,
+                                                                       coingecko_stub, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_one(
+        {"coin_id": "a", "name": "A", "categories": ["Masternodes"], "market_data": {"current_price": {"usd": 10.0}}})
+    body = {"filters": {"coin_ids": ["a"]}, "vs_currency": "eur"}
+    generation = get_response_cache().generation.current()
+    assert api_client.post("/v1/specific_coins", json=body, headers=auth_headers).json["data"][0][
+        "current_price_eur"] == 9.0
+
+    coingecko_stub.fx_rates["EUR"] = 0.5
+    assert get_fx_rates().refresh()
+
+    assert api_client.post("/v1/specific_coins", json=body, headers=auth_headers).json["data"][0][
+        "current_price_eur"] == 5.0
+    assert get_response_cache().generation.current() == generation
+
+
+def test_background_refresh_fetches_ahead_of_requests(coingecko_stub):
+    rates = FXRateCache(ttl=3600, refresh_interval=0.05)
+    rates.start()
+    try:
+        deadline = time.monotonic() + 5
+        while coingecko_stub.requests.count("/fx/latest/USD") < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        rates.stop()
+    assert coingecko_stub.requests.count("/fx/latest/USD") >= 3
+    assert rates.rate("eur") == 0.9
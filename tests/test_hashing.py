@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+import pytest
+
+from crypto_project.api.common import hashing
+from crypto_project.api.common.hashing import HashingPoolSaturated
+from crypto_project.api.common.hashing import HashingUnavailable
+from crypto_project.api.common.hashing import PasswordHasher
+
+SIGNUP = {"username": "allwin", "email": "allwin@example.com", "password": "Secure@123"}
+
+
+def make_hasher(max_workers, /, *, max_queue=0, method="pbkdf2:sha256:1000", timeout=30):
+    return PasswordHasher(method=method, salt_length=16, max_workers=max_workers,
+                          max_queue=max_queue, timeout=timeout)
+
+
+@pytest.fixture
+def inline_hashing(monkeypatch):
+    monkeypatch.setattr(hashing, "_hasher", make_hasher(0))
+
+
+def test_pool_hashes_and_verifies_in_worker_process():
+    hasher = make_hasher(1)
+    try:
+        pwhash = hasher.hash("Secure@123")
+        assert pwhash.startswith("pbkdf2:sha256:1000$")
+        assert hasher.verify(pwhash, "Secure@123")
+        assert not hasher.verify(pwhash, "wrong")
+    finally:
+        hasher.shutdown()
+
+
+def test_saturated_pool_rejects_instead_of_queueing():
+    hasher = make_hasher(1, method="pbkdf2:sha256:3000000")
+    worker = threading.Thread(target=hasher.hash, args=("Secure@123",))
+    try:
+        worker.start()
+        # The slow hash holds the only slot for the process spawn plus ~1s of hashing
+        time.sleep(0.1)
+        with pytest.raises(HashingPoolSaturated):
+            hasher.verify("pbkdf2:sha256:1000$salt$hash", "Secure@123")
+    finally:
+        worker.join()
+        hasher.shutdown()
+
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes():
+    hasher = make_hasher(1, method="pbkdf2:sha256:3000000", timeout=0.1)
+    try:
+        with pytest.raises(HashingUnavailable):
+            hasher.hash("Secure@123")
+        with pytest.raises(HashingPoolSaturated):
+            hasher.verify("pbkdf2:sha256:1000$salt$hash", "Secure@123")
+    finally:
+        hasher.shutdown()
+
+
+def test_broken_pool_is_replaced():
+    hasher = make_hasher(1)
+    try:
+        with pytest.raises(HashingUnavailable):
+            # A worker dying mid-task breaks the pool
+            hasher._PasswordHasher__run(os._exit, 1)
+        assert hasher.verify(hasher.hash("Secure@123"), "Secure@123")
+    finally:
+        hasher.shutdown()
+
+
+def test_signup_and_login_use_the_hasher(api_client, inline_hashing):
+    assert api_client.post("/v1/signup", json=SIGNUP).status_code == 200
+
+    response = api_client.post("/v1/auth/login", json={"username": "allwin", "password": "Secure@123"})
+    assert response.status_code == 200
+    assert response.json["data"]["access_token"]
+    response = api_client.post("/v1/auth/login", json={"username": "allwin", "password": "Wrong@123"})
+    assert response.status_code == 401
+
+
+def test_login_returns_503_when_hashing_is_saturated(api_client, inline_hashing, monkeypatch):
+    assert api_client.post("/v1/signup", json=SIGNUP).status_code == 200
+
+    def saturated(*args):
+        raise HashingPoolSaturated()
+
+    monkeypatch.setattr(hashing._hasher, "verify", saturated)
+    response = api_client.post("/v1/auth/login", json={"username": "allwin", "password": "Secure@123"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,108 @@
+import itertools
+import time
+import types
+
+from crypto_project.api.common.history import PriceHistory
+from crypto_project.api.common.refresh import ChangeDetector
+from crypto_project.api.v1 import actions
+from crypto_project.api.v1.actions import CoinDetails
+
+DAY = 86400
+
+
+def coin(price, /, *, volume=100.0):
+    return {"market_data": {"current_price": {"usd": price}, "market_cap": {"usd": price * 10},
+                            "total_volume": {"usd": volume}}}
+
+
+def record(history, points):
+    with history.writer() as writer:
+        for coin_id, t, price in points:
+            history.record(writer, coin_id, coin(price, volume=price * 2), t)
+
+
+def test_refresh_appends_points_to_daily_buckets(coingecko_stub, mongo_client):
+    CoinDetails().data_refresh()
+    CoinDetails().data_refresh()
+
+    buckets = list(mongo_client.crypto_db.price_history.find({"coin_id": "coin007"}))
+    assert sum(len(bucket["points"]) for bucket in buckets) == 2
+    assert buckets[0]["points"][0]["p"] == coingecko_stub.coins["coin007"]["market_data"]["current_price"]["usd"]
+    assert buckets[0]["start"] % DAY == 0
+    assert buckets[0]["expire_at"].timestamp() >= buckets[0]["start"] + DAY + 30 * DAY
+
+
+def test_points_are_stamped_when_their_coin_arrives(coingecko_stub, mongo_client, monkeypatch):
+    clock = itertools.count(40 * DAY, 60)
+    monkeypatch.setattr(actions, "time", types.SimpleNamespace(time=lambda: next(clock)))
+
+    CoinDetails().data_refresh()
+
+    stamps = [bucket["points"][0]["t"] for bucket in mongo_client.crypto_db.price_history.find()]
+    assert len(set(stamps)) == len(stamps) == 50
+
+
+def test_resumed_refresh_does_not_record_coins_twice(coingecko_stub, mongo_client, monkeypatch):
+    original_add = ChangeDetector.add
+
+    def crash_at_coin_025(self, coin_id, coin_data):
+        if coin_id == "coin025":
+            raise RuntimeError("worker killed")
+        original_add(self, coin_id, coin_data)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ChangeDetector, "add", crash_at_coin_025)
+        CoinDetails().data_refresh()
+    recorded = mongo_client.crypto_db.price_history.count_documents({})
+    CoinDetails().data_refresh()
+
+    assert 0 < recorded < 50
+    counts = [len(bucket["points"]) for bucket in mongo_client.crypto_db.price_history.find()]
+    assert len(counts) == 50 and set(counts) == {1}
+
+
+def test_candles_are_grouped_per_interval_across_buckets(mongo_client):
+    history = PriceHistory()
+    start = 10 * DAY
+    record(history, [("btc", start - 60, 1.0), ("btc", start, 5.0), ("btc", start + 600, 7.0),
+                     ("btc", start + 1800, 4.0), ("btc", start + 3700, 6.0), ("btc", start + DAY + 10, 9.0),
+                     ("eth", start + 10, 100.0)])
+
+    candles = history.candles("btc", start, start + 2 * DAY, 3600)
+
+    assert candles == [
+        {"t": start, "open": 5.0, "high": 7.0, "low": 4.0, "close": 4.0, "volume": 8.0, "points": 3},
+        {"t": start + 3600, "open": 6.0, "high": 6.0, "low": 6.0, "close": 6.0, "volume": 12.0, "points": 1},
+        {"t": start + DAY, "open": 9.0, "high": 9.0, "low": 9.0, "close": 9.0, "volume": 18.0, "points": 1},
+    ]
+    assert mongo_client.crypto_db.price_history.count_documents({"coin_id": "btc"}) == 3
+
+
+def test_history_endpoint_returns_points_or_candles(api_client, auth_headers, mongo_client):
+    start = 20 * DAY
+    record(PriceHistory(), [("btc", start + 60, 1.0), ("btc", start + 120, 2.0)])
+
+    response = api_client.get(f"/v1/coins/btc/history?start={start}&end={start + 3600}", headers=auth_headers)
+    assert response.json["data"]["points"] == [
+        {"t": start + 60, "price": 1.0, "market_cap": 10.0, "volume": 2.0},
+        {"t": start + 120, "price": 2.0, "market_cap": 20.0, "volume": 4.0},
+    ]
+
+    response = api_client.get(f"/v1/coins/btc/history?start={start}&end={start + 3600}&interval=3600",
+                              headers=auth_headers)
+    assert [candle["close"] for candle in response.json["data"]["candles"]] == [2.0]
+    too_many = api_client.get(f"/v1/coins/btc/history?start=0&end={start}&interval=1", headers=auth_headers)
+    assert too_many.status_code == 400
+    assert api_client.get("/v1/coins/btc/history?start=x", headers=auth_headers).status_code == 400
+
+
+def test_history_without_end_follows_the_clock(api_client, auth_headers, mongo_client, monkeypatch):
+    now = [30 * DAY]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    first = api_client.get("/v1/coins/btc/history", headers=auth_headers)
+    now[0] += 600
+    second = api_client.get("/v1/coins/btc/history", headers=auth_headers)
+
+    assert second.json["data"]["end"] == first.json["data"]["end"] + 600
+    assert "ETag" not in second.headers
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+from oslo_config import cfg
+
+from crypto_project.api.common.utils import ensure_indexes
+
+MONGO_URI = os.environ.get("CRYPTO_TEST_MONGO_URI")
+
+# (collection, filter, distinct field) for every query on a request path
+HOT_QUERIES = [
+    ("coin_details", {"coin_id": {"$in": ["bitcoin", "ethereum"]}}, None),
+    ("coin_details", {"categories": {"$in": ["Masternodes"]}}, None),
+    ("categories", {"_id": "Masternodes"}, None),
+    ("user", {"username": "allwin"}, None),
+]
+
+
+def test_ensure_indexes_is_idempotent(server_commands, mongo_client):
+    assert ensure_indexes() == {}
+    created = server_commands.count("create_indexes")
+    server_commands.clear()
+
+    assert ensure_indexes() == {}
+    assert "create_indexes" not in server_commands
+    assert created == 7
+    assert "coin_id" in mongo_client.crypto_db.coin_details.index_information()
+
+
+def test_verify_only_reports_missing_indexes(mongo_client):
+    missing = ensure_indexes(create=False)
+
+    assert missing["coin_details"] == ["coin_id", "categories"]
+    assert missing["user"] == ["username"]
+
+
+def test_unbuildable_unique_index_is_reported(mongo_client):
+    mongo_client.crypto_db.user.insert_many([{"username": "allwin"}, {"username": "allwin"}])
+
+    assert ensure_indexes() == {"user": ["username"]}
+
+
+def _stages(plan):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+@pytest.mark.skipif(not MONGO_URI, reason="set CRYPTO_TEST_MONGO_URI to run against a local mongod")
+@pytest.mark.parametrize("collection_name, query, distinct_field", HOT_QUERIES)
+def test_hot_queries_do_not_scan_collections(collection_name, query, distinct_field):
+    from pymongo import MongoClient
+
+    cfg.CONF.set_override("uri", MONGO_URI, group="database")
+    cfg.CONF.set_override("name", "crypto_explain_test", group="database")
+    client = MongoClient(MONGO_URI)
+    try:
+        ensure_indexes()
+        db = client.crypto_explain_test
+        db.coin_details.insert_many([{"coin_id": f"coin{i}", "categories": ["Masternodes"]} for i in range(100)])
+        db.user.insert_one({"username": "allwin"})
+        if distinct_field:
+            explain = db.command("explain", {"distinct": collection_name, "key": distinct_field, "query": query})
+        else:
+            explain = db[collection_name].find(query).explain()
+
+        assert "COLLSCAN" not in set(_stages(explain["queryPlanner"]["winningPlan"]))
+    finally:
+        cfg.CONF.clear_override("uri", group="database")
+        cfg.CONF.clear_override("name", group="database")
+        client.drop_database("crypto_explain_test")
+        client.close()
@@ -0,0 +1,79 @@
+import time
+
+from oslo_config import cfg
+
+from crypto_project.api.common.ingestion import IngestionEngine
+from crypto_project.api.common.ingestion import TokenBucket
+from crypto_project.api.v1.actions import CoinDetails
+
+
+def test_fetches_every_coin_from_stub(coingecko_stub):
+    with IngestionEngine(max_workers=4) as engine:
+        coins = engine.fetch_coins_list()
+        results = list(engine.fetch_coins(coin["id"] for coin in coins))
+
+    assert len(results) == 50
+    assert all(error is None and data["id"] == coin_id for coin_id, data, error in results)
+
+
+def test_rate_limited_coin_is_retried_without_failing_others(coingecko_stub):
+    coingecko_stub.rate_limited["coin007"] = 2
+    with IngestionEngine(max_workers=4) as engine:
+        results = dict((coin_id, data) for coin_id, data, _ in engine.fetch_coins(["coin007", "coin008"]))
+
+    assert results["coin007"]["id"] == "coin007"
+    assert results["coin008"]["id"] == "coin008"
+    assert coingecko_stub.requests.count("/api/v3/coins/coin007") == 3
+
+
+def test_coin_gives_up_after_max_retries(coingecko_stub):
+    coingecko_stub.rate_limited["coin001"] = 10
+    with IngestionEngine(max_workers=2, max_retries=3) as engine:
+        [(coin_id, data, error)] = list(engine.fetch_coins(["coin001"]))
+
+    assert data is None
+    assert error is not None
+
+
+def test_missing_coin_is_skipped(coingecko_stub):
+    with IngestionEngine() as engine:
+        [(_, data, error)] = list(engine.fetch_coins(["no-such-coin"]))
+
+    assert data is None and error is None
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(100, 1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_token_bucket_backs_off_on_rate_limit():
+    bucket = TokenBucket(100, 5)
+    bucket.penalize(0.05)
+    assert bucket.rate == 50
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.05
+
+
+def test_data_refresh_stores_stub_coins(coingecko_stub, mongo_client):
+    response = CoinDetails().data_refresh()
+
+    assert response.status_code == 200
+    assert mongo_client.crypto_db.coin_details.count_documents({}) == 50
+
+
+def test_data_refresh_writes_in_batches(coingecko_stub, server_commands):
+    cfg.CONF.set_override("bulk_batch_size", 20, group="database")
+    try:
+        CoinDetails().data_refresh()
+    finally:
+        cfg.CONF.clear_override("bulk_batch_size", group="database")
+
+    # 50 coins in batches of 20, into coin_details and into the price history
+    assert server_commands.count("bulk_write") == 6
+    # the only single-document update left is the refresh job's final checkpoint
+    assert server_commands.count("update_one") == 1
@@ -0,0 +1,145 @@
+import datetime
+import multiprocessing
+import os
+import time
+
+import pytest
+from oslo_config import cfg
+
+from crypto_project.api.common.leases import LeaseLost
+from crypto_project.api.common.leases import ShardLease
+from crypto_project.api.common.leases import shard_of
+from crypto_project.api.v1.actions import CoinDetails
+
+MONGO_URI = os.environ.get("CRYPTO_TEST_MONGO_URI")
+
+
+@pytest.fixture
+def sharded_refresh():
+    cfg.CONF.set_override("shard_count", 3, group="refresh")
+    yield
+    cfg.CONF.clear_override("shard_count", group="refresh")
+
+
+def test_shard_of_is_stable_and_in_range():
+    coin_ids = [f"coin{i}" for i in range(100)]
+    shards = [shard_of(coin_id, 4) for coin_id in coin_ids]
+
+    assert shards == [shard_of(coin_id, 4) for coin_id in reversed(coin_ids)][::-1]
+    assert set(shards) == {0, 1, 2, 3}
+
+
+def test_replicas_claim_distinct_shards(mongo_client):
+    leases = [ShardLease.claim(3, owner=f"replica-{i}") for i in range(3)]
+
+    assert sorted(lease.shard for lease in leases) == [0, 1, 2]
+    assert ShardLease.claim(3, owner="replica-3") is None
+
+
+def test_expired_lease_is_reclaimed(mongo_client):
+    crashed = ShardLease.claim(1, owner="crashed")
+    mongo_client.crypto_db.refresh_leases.update_one(
+        {"_id": 0}, {"$set": {"expires_at": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}})
+
+    lease = ShardLease.claim(1, owner="survivor")
+
+    assert lease.shard == 0
+    with pytest.raises(LeaseLost):
+        crashed.renew()
+    lease.renew()
+
+
+def test_completed_shard_is_not_refreshed_again_until_min_age(mongo_client):
+    with ShardLease.claim(1, owner="replica-0"):
+        pass
+
+    assert ShardLease.claim(1, owner="replica-1") is None
+    cfg.CONF.set_override("shard_min_age", -1, group="refresh")
+    try:
+        assert ShardLease.claim(1, owner="replica-1") is not None
+    finally:
+        cfg.CONF.clear_override("shard_min_age", group="refresh")
+
+
+def test_sharded_refresh_covers_every_coin(coingecko_stub, mongo_client, sharded_refresh):
+    stats = CoinDetails().data_refresh().json["data"]
+
+    assert stats["refreshed"] == 50
+    assert mongo_client.crypto_db.coin_details.count_documents({}) == 50
+    assert sorted(job["shard"] for job in mongo_client.crypto_db.refresh_jobs.find()) == [0, 1, 2]
+
+
+def test_refresh_claims_each_shard_once_per_run(coingecko_stub, mongo_client, sharded_refresh):
+    # Completed shards are immediately claimable again, as when one replica runs every shard
+    cfg.CONF.set_override("shard_min_age", -1, group="refresh")
+    try:
+        stats = CoinDetails().data_refresh().json["data"]
+    finally:
+        cfg.CONF.clear_override("shard_min_age", group="refresh")
+
+    assert stats["refreshed"] == 50
+    assert len(coingecko_stub.requests) == 1 + 50
+
+
+def test_heartbeat_renews_the_lease_and_detects_takeover(mongo_client):
+    lease = ShardLease.claim(1, owner="replica-0")
+    lease.ttl = 0.3
+    with lease:
+        time.sleep(0.25)
+        document = mongo_client.crypto_db.refresh_leases.find_one({"_id": 0})
+        assert document["expires_at"] > datetime.datetime.utcnow()
+        lease.ensure_held()
+
+        mongo_client.crypto_db.refresh_leases.update_one({"_id": 0}, {"$set": {"owner": "replica-1"}})
+        time.sleep(0.25)
+        assert lease.lost
+        with pytest.raises(LeaseLost):
+            lease.ensure_held()
+
+
+def test_lost_shard_does_not_abort_the_refresh(coingecko_stub, mongo_client, sharded_refresh, monkeypatch):
+    refresh_coins = CoinDetails.refresh_coins
+    lost = []
+
+    def losing_first_shard(self, engine, coin_ids, /, *, shard=None, lease=None):
+        if not lost:
+            lost.append(shard)
+            raise LeaseLost(f"Lease on refresh shard {shard} was taken over")
+        return refresh_coins(self, engine, coin_ids, shard=shard, lease=lease)
+
+    monkeypatch.setattr(CoinDetails, "refresh_coins", losing_first_shard)
+    response = CoinDetails().data_refresh()
+
+    assert response.status_code == 200
+    refreshed_shards = sorted(job["shard"] for job in mongo_client.crypto_db.refresh_jobs.find())
+    assert len(refreshed_shards) == 2 and lost[0] not in refreshed_shards
+
+
+def _run_replica(uri):
+    cfg.CONF.set_override("uri", uri, group="database")
+    CoinDetails().data_refresh()
+
+
+@pytest.mark.skipif(not MONGO_URI, reason="set CRYPTO_TEST_MONGO_URI to run against a local mongod")
+def test_replica_processes_split_the_refresh(coingecko_stub, sharded_refresh):
+    from pymongo import MongoClient
+
+    cfg.CONF.set_override("name", "crypto_shard_test", group="database")
+    client = MongoClient(MONGO_URI)
+    client.drop_database("crypto_shard_test")
+    try:
+        context = multiprocessing.get_context("fork")
+        replicas = [context.Process(target=_run_replica, args=(MONGO_URI,)) for _ in range(3)]
+        for replica in replicas:
+            replica.start()
+        for replica in replicas:
+            replica.join(60)
+
+        db = client.crypto_shard_test
+        assert db.coin_details.count_documents({}) == 50
+        assert len(coingecko_stub.requests) == 3 + 50
+        assert sorted(job["shard"] for job in db.refresh_jobs.find()) == [0, 1, 2]
+    finally:
+        cfg.CONF.clear_override("name", group="database")
+        client.drop_database("crypto_shard_test")
+        client.close()
@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+from oslo_config import cfg
+
+from common import mongo_adapter
+from common.mongo_adapter import DatabaseAdapter
+
+
+def test_adapters_share_one_client(mongo_client):
+    DatabaseAdapter()
+    user_db = DatabaseAdapter()
+    user_db.set_collection_name("user")
+    user_db.insert_document({"username": "allwin"})
+
+    assert len(mongo_client.created) == 1
+    assert DatabaseAdapter().get_count({}) == 0
+    assert user_db.find_document({"username": "allwin"})
+
+
+def test_client_uses_configured_pool_options(mongo_client):
+    cfg.CONF.set_override("max_pool_size", 5, group="database")
+    try:
+        DatabaseAdapter()
+    finally:
+        cfg.CONF.clear_override("max_pool_size", group="database")
+
+    _, options = mongo_client.created[0]
+    assert options["maxPoolSize"] == 5
+    assert "socketTimeoutMS" not in options
+
+
+def test_client_registry_resets_in_forked_child(mongo_client):
+    DatabaseAdapter()
+    assert mongo_adapter._clients
+
+    mongo_adapter._clients_pid = os.getpid() + 1
+    DatabaseAdapter()
+
+    assert mongo_adapter._clients_pid == os.getpid()
+    assert len(mongo_client.created) == 2
+
+
+@pytest.mark.parametrize("call", [
+    lambda db: db.find_document({"coin_id": "bitcoin"}),
+    lambda db: list(db.find_documents({}, limit=10)),
+    lambda db: db.get_count({}),
+    lambda db: db.get_distinct("categories", query={}),
+    lambda db: db.insert_document({"coin_id": "bitcoin"}),
+    lambda db: db.insert_documents([{"coin_id": "ethereum"}]),
+    lambda db: db.update_document({"coin_id": "bitcoin"}, {"$set": {"name": "Bitcoin"}}, upsert=True),
+])
+def test_crud_calls_cost_one_server_command(server_commands, call):
+    DatabaseAdapter().bootstrap_collections([cfg.CONF.database.collection_name])
+    server_commands.clear()
+
+    for _ in range(100):
+        call(DatabaseAdapter())
+
+    assert len(server_commands) == 100
+    assert "list_collection_names" not in server_commands
+
+
+def test_unknown_collection_is_listed_once(server_commands):
+    db = DatabaseAdapter()
+    db.set_collection_name("user")
+    for _ in range(10):
+        db.find_document({"username": "allwin"})
+
+    assert server_commands.count("list_collection_names") == 1
+    assert server_commands.count("create_collection") == 1
+    assert server_commands.count("find_one") == 10
+
+
+def test_bulk_writer_flushes_by_batch_size(server_commands):
+    db = DatabaseAdapter()
+    with db.bulk_writer(batch_size=20, flush_interval=60) as writer:
+        for i in range(50):
+            writer.upsert({"coin_id": f"coin{i}"}, {"$set": {"name": f"Coin {i}"}})
+
+    assert server_commands.count("bulk_write") == 3
+    assert [batch.succeeded for batch in writer.batches] == [20, 20, 10]
+    assert writer.failed == 0
+    assert db.get_count({}) == 50
+
+
+def test_bulk_writer_flushes_by_interval(mongo_client):
+    with DatabaseAdapter().bulk_writer(batch_size=1000, flush_interval=0.01) as writer:
+        writer.upsert({"coin_id": "bitcoin"}, {"$set": {"name": "Bitcoin"}})
+        time.sleep(0.02)
+        writer.upsert({"coin_id": "ethereum"}, {"$set": {"name": "Ethereum"}})
+        assert len(writer.batches) == 1
+
+
+def test_bulk_writer_reports_failed_writes(mongo_client):
+    db = DatabaseAdapter()
+    mongo_client.crypto_db.coin_details.create_index("symbol", unique=True)
+    with db.bulk_writer(batch_size=10) as writer:
+        writer.upsert({"coin_id": "bitcoin"}, {"$set": {"symbol": "btc"}})
+        writer.upsert({"coin_id": "bitcoin-clone"}, {"$set": {"symbol": "btc"}})
+
+    assert writer.succeeded == 1
+    assert writer.failed == 1
@@ -0,0 +1,163 @@
+import threading
+import time
+
+from oslo_config import cfg
+
+from common.mongo_adapter import DatabaseAdapter
+from crypto_project.api.common.definitions import JobStatus
+from crypto_project.api.common.refresh import ChangeDetector
+from crypto_project.api.common.refresh import RefreshJob
+from crypto_project.api.common.refresh import RefreshScheduler
+from crypto_project.api.common.refresh import fingerprint
+from crypto_project.api.common.response_cache import get_response_cache
+from crypto_project.api.v1.actions import CoinDetails
+from crypto_project.api.v1.actions import app
+from crypto_project.api.v1.actions import data_refresh_lock
+
+
+def test_fingerprint_ignores_key_order():
+    assert fingerprint({"a": 1, "b": [1, 2]}) == fingerprint({"b": [1, 2], "a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+
+
+def test_second_refresh_skips_unchanged_coins(coingecko_stub, mongo_client):
+    first = CoinDetails().data_refresh().json["data"]
+    second = CoinDetails().data_refresh().json["data"]
+
+    assert (first["refreshed"], first["unchanged"], first["failed"]) == (50, 0, 0)
+    assert (second["refreshed"], second["unchanged"], second["failed"]) == (0, 50, 0)
+
+
+def test_changed_coin_only_sets_differing_fields(coingecko_stub, mongo_client):
+    CoinDetails().data_refresh()
+    coingecko_stub.coins["coin003"]["market_data"]["current_price"]["cad"] = 99.0
+    del coingecko_stub.coins["coin004"]["categories"]
+
+    db = DatabaseAdapter()
+    upserts = []
+    with db.bulk_writer() as writer:
+        writer.upsert = lambda query, update: upserts.append((query, update))
+        detector = ChangeDetector(db, writer)
+        for coin_id, coin in coingecko_stub.coins.items():
+            detector.add(coin_id, coin)
+        stats = detector.close()
+
+    assert stats.unchanged == 48
+    changes = dict((query["coin_id"], update) for query, update in upserts)
+    assert set(changes["coin003"]["$set"]) == {"market_data", "fingerprint", "field_fingerprints"}
+    assert changes["coin004"]["$unset"] == {"categories": ""}
+
+
+def test_refresh_slims_documents_stored_without_fingerprints(coingecko_stub, mongo_client):
+    legacy = dict(coingecko_stub.coins["coin003"], coin_id="coin003", description={"en": "x" * 1000},
+                  localization={"de": "Coin"}, tickers=[{"base": "C3"}])
+    mongo_client.crypto_db.coin_details.insert_one(legacy)
+
+    CoinDetails().data_refresh()
+
+    document = mongo_client.crypto_db.coin_details.find_one({"coin_id": "coin003"}, {"_id": 0})
+    assert set(document) == {"coin_id", "fingerprint", "field_fingerprints"} | set(coingecko_stub.coins["coin003"])
+
+
+def test_slowly_arriving_coins_are_written_after_the_flush_interval(coingecko_stub, mongo_client):
+    db = DatabaseAdapter()
+    writer = db.bulk_writer()
+    detector = ChangeDetector(db, writer, batch_size=500, flush_interval=0.05)
+
+    detector.add("coin000", coingecko_stub.coins["coin000"])
+    assert mongo_client.crypto_db.coin_details.count_documents({}) == 0
+    time.sleep(0.06)
+    detector.add("coin001", coingecko_stub.coins["coin001"])
+
+    assert mongo_client.crypto_db.coin_details.count_documents({}) == 2
+
+
+def test_refresh_counts_failed_coins(coingecko_stub, mongo_client):
+    coingecko_stub.rate_limited["coin010"] = 100
+
+    stats = CoinDetails().data_refresh().json["data"]
+
+    assert (stats["refreshed"], stats["unchanged"], stats["failed"]) == (49, 0, 1)
+
+
+def test_refresh_job_records_completed_progress(coingecko_stub, mongo_client):
+    CoinDetails().data_refresh()
+
+    with app.app_context():
+        progress = CoinDetails().data_refresh_status().json["data"]
+    assert progress["status"] == JobStatus.COMPLETED
+    assert progress["processed"] == progress["total"] == 50
+    assert progress["cursor"] == "coin049"
+    assert progress["eta_seconds"] is None
+
+
+def test_interrupted_refresh_resumes_from_checkpoint(coingecko_stub, mongo_client, monkeypatch):
+    cfg.CONF.set_override("checkpoint_interval", 10, group="refresh")
+    original_add = ChangeDetector.add
+
+    def crash_after_coin_025(self, coin_id, coin_data):
+        if coin_id == "coin025":
+            raise RuntimeError("worker killed")
+        original_add(self, coin_id, coin_data)
+
+    try:
+        with monkeypatch.context() as patch:
+            patch.setattr(ChangeDetector, "add", crash_after_coin_025)
+            CoinDetails().data_refresh()
+        interrupted = RefreshJob.latest()
+        coingecko_stub.requests.clear()
+        CoinDetails().data_refresh()
+    finally:
+        cfg.CONF.clear_override("checkpoint_interval", group="refresh")
+
+    resumed = RefreshJob.latest()
+    assert interrupted["status"] == JobStatus.FAILED
+    assert resumed["_id"] == interrupted["_id"]
+    assert resumed["status"] == JobStatus.COMPLETED
+    assert len(coingecko_stub.requests) < 50
+    assert not any(path.endswith(f"/{interrupted['cursor']}") for path in coingecko_stub.requests)
+    assert mongo_client.crypto_db.coin_details.count_documents({}) == 50
+
+
+def test_concurrent_triggers_join_the_running_refresh():
+    release = threading.Event()
+    runs = []
+    scheduler = RefreshScheduler(lambda: (runs.append(1), release.wait(5)))
+
+    started = [scheduler.trigger() for _ in range(10)]
+    release.set()
+    assert scheduler.wait(5)
+
+    assert started == [True] + [False] * 9
+    assert len(runs) == 1
+    assert scheduler.trigger()
+    assert scheduler.wait(5)
+
+
+def test_scheduler_runs_refresh_periodically():
+    runs = threading.Semaphore(0)
+    scheduler = RefreshScheduler(runs.release)
+    scheduler.start(0.01)
+    try:
+        assert all(runs.acquire(timeout=5) for _ in range(3))
+    finally:
+        scheduler.stop()
+
+
+def test_data_refresh_is_single_flight(mongo_client):
+    with data_refresh_lock:
+        response = CoinDetails().data_refresh()
+
+    assert response.json["message"] == "Data refresh already in progress"
+    assert RefreshJob.latest() is None
+
+
+def test_failed_cache_invalidation_still_releases_the_lock(coingecko_stub, mongo_client, monkeypatch):
+    def unavailable():
+        raise RuntimeError("generation store unavailable")
+
+    monkeypatch.setattr(get_response_cache(), "invalidate", unavailable)
+    stats = CoinDetails().data_refresh().json["data"]
+
+    assert stats["refreshed"] == 50
+    assert not data_refresh_lock.locked()
@@ -0,0 +1,85 @@
+from crypto_project.api.common.response_cache import ResponseCache
+from crypto_project.api.common.response_cache import SharedGeneration
+from crypto_project.api.v1.actions import refresh_scheduler
+
+COIN = {"coin_id": "local000", "name": "Local", "symbol": "loc", "categories": ["Masternodes"],
+        "market_data": {"current_price": {"cad": 1.5}}}
+
+
+def test_read_endpoints_are_served_from_cache_until_refresh(api_client, auth_headers, coingecko_stub,
+                                                            server_commands, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_one(dict(COIN))
+    body = {"filters": {"categories": ["Masternodes"]}, "page": 1, "limit": 5}
+
+    first = api_client.post("/v1/specific_coins", json=body, headers=auth_headers)
+    server_commands.clear()
+    second = api_client.post("/v1/specific_coins", json=dict(reversed(list(body.items()))), headers=auth_headers)
+
+    assert second.json == first.json
+    assert "aggregate" not in server_commands and "count_documents" not in server_commands
+    stats = api_client.get("/v1/cache/stats", headers=auth_headers).json["data"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    api_client.get("/v1/data_refresh")
+    assert refresh_scheduler.wait(10)
+    third = api_client.post("/v1/specific_coins", json=body, headers=auth_headers)
+    assert len(third.json["data"]) == 5
+    assert api_client.get("/v1/cache/stats", headers=auth_headers).json["data"]["misses"] == 2
+
+
+def test_failed_responses_are_not_cached(api_client, auth_headers):
+    assert api_client.get("/v1/coins/categories/Unknown", headers=auth_headers).status_code == 400
+    assert api_client.get("/v1/coins/categories/Unknown", headers=auth_headers).status_code == 400
+    assert api_client.get("/v1/cache/stats", headers=auth_headers).json["data"]["size"] == 0
+
+
+def test_shared_generation_invalidates_other_replicas(mongo_client):
+    replica_a = ResponseCache(8, generation=SharedGeneration(poll_interval=0))
+    replica_b = ResponseCache(8, generation=SharedGeneration(poll_interval=0))
+    token, _ = replica_b.generation.current()
+    replica_b.get((token, "/v1/coins"))
+    replica_b.put((token, "/v1/coins"), (200, b"{}", []))
+
+    replica_a.invalidate()
+
+    new_token, _ = replica_b.generation.current()
+    assert new_token != token
+    assert replica_b.get((new_token, "/v1/coins")) is None
+    assert replica_b.stats()["size"] == 0
+
+
+def test_conditional_polls_get_304_without_touching_mongo(api_client, auth_headers, coingecko_stub,
+                                                          server_commands, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_one(dict(COIN))
+    first = api_client.get("/v1/coins/categories", headers=auth_headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"] and "no-cache" in first.headers["Cache-Control"]
+
+    server_commands.clear()
+    poll = api_client.get("/v1/coins/categories", headers=dict(auth_headers, **{"If-None-Match": etag}))
+    assert poll.status_code == 304 and poll.data == b""
+    assert poll.headers["ETag"] == etag
+    assert server_commands == []
+    since = api_client.get("/v1/coins/categories",
+                           headers=dict(auth_headers, **{"If-Modified-Since": first.headers["Last-Modified"]}))
+    assert since.status_code == 304
+
+    other = api_client.get("/v1/coins?page=1&limit=1", headers=dict(auth_headers, **{"If-None-Match": etag}))
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+    api_client.get("/v1/data_refresh")
+    assert refresh_scheduler.wait(10)
+    changed = api_client.get("/v1/coins/categories", headers=dict(auth_headers, **{"If-None-Match": etag}))
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert api_client.get("/v1/cache/stats", headers=auth_headers).json["data"]["not_modified"] == 2
+
+
+def test_post_endpoints_ignore_conditional_headers(api_client, auth_headers, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_one(dict(COIN))
+    body = {"filters": {"coin_ids": [COIN["coin_id"]]}}
+    first = api_client.post("/v1/specific_coins", json=body, headers=auth_headers)
+
+    again = api_client.post("/v1/specific_coins", json=body,
+                            headers=dict(auth_headers, **{"If-None-Match": first.headers["ETag"]}))
+
+    assert again.status_code == 200 and again.json == first.json
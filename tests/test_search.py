@@ -0,0 +1,77 @@
+from crypto_project.api.common.search import SearchIndex
+from crypto_project.api.common.search import current_search_index
+from crypto_project.api.v1.actions import refresh_scheduler
+
+COINS = [
+    {"coin_id": "bitcoin", "name": "Bitcoin", "symbol": "btc", "market_cap_rank": 1},
+    {"coin_id": "bitcoin-cash", "name": "Bitcoin Cash", "symbol": "bch", "market_cap_rank": 20},
+    {"coin_id": "wrapped-bitcoin", "name": "Wrapped Bitcoin", "symbol": "wbtc", "market_cap_rank": 15},
+    {"coin_id": "bittensor", "name": "Bittensor", "symbol": "tao", "market_cap_rank": 30},
+    {"coin_id": "bit", "name": "Bit Token", "symbol": "bit", "market_cap_rank": None},
+    {"coin_id": "ethereum", "name": "Ethereum", "symbol": "eth", "market_cap_rank": 2},
+]
+
+
+def ids(results):
+    return [result["coin_id"] for result in results]
+
+
+def test_prefix_matches_are_ranked_by_match_kind_then_market_cap():
+    index = SearchIndex(COINS)
+
+    assert ids(index.search("BIT", 10)) == ["bit", "bitcoin", "bitcoin-cash", "bittensor", "wrapped-bitcoin"]
+    assert index.search("bit", 1)[0]["match"] == "exact"
+    assert ids(index.search("bitcoin", 3)) == ["bitcoin", "bitcoin-cash", "wrapped-bitcoin"]
+    assert ids(index.search("cash", 5)) == ["bitcoin-cash"]
+    assert ids(index.search("b", 3)) == ["bitcoin", "wrapped-bitcoin", "bitcoin-cash"]
+    assert ids(index.search("et", 5)) == ["ethereum"]
+    assert index.search("", 5) == []
+
+
+def test_name_word_matches_are_not_labelled_exact():
+    index = SearchIndex(COINS + [{"coin_id": "cashaa", "name": "Cashaa", "symbol": "cas", "market_cap_rank": 900}])
+
+    results = index.search("cash", 5)
+    assert [(result["coin_id"], result["match"]) for result in results] == [("cashaa", "prefix"),
+                                                                            ("bitcoin-cash", "prefix")]
+    assert [result["match"] for result in index.search("bitcoin", 3)] == ["exact", "prefix", "prefix"]
+
+
+def test_misspellings_fall_back_to_fuzzy_matches():
+    index = SearchIndex(COINS)
+
+    results = index.search("etherium", 3)
+    assert ids(results) == ["ethereum"] and results[0]["match"] == "fuzzy"
+    assert index.search("zzzzzz", 3) == []
+
+
+def test_upsert_reindexes_a_changed_coin():
+    index = SearchIndex(COINS)
+    index.upsert("bittensor", {"name": "Bittensor", "symbol": "tao", "market_cap_rank": 3})
+    index.upsert("ethereum", {"name": "Ether", "symbol": "eth", "market_cap_rank": 2})
+    index.upsert("solana", {"name": "Solana", "symbol": "sol", "market_cap_rank": 5})
+
+    assert ids(index.search("bi", 2)) == ["bitcoin", "bittensor"]
+    assert index.search("ether", 1)[0] == {"coin_id": "ethereum", "name": "Ether", "symbol": "eth",
+                                           "market_cap_rank": 2, "match": "exact"}
+    assert ids(index.search("so", 3)) == ["solana"]
+    assert len(index) == 7
+
+
+def test_search_endpoint_is_updated_incrementally_by_refresh(api_client, auth_headers, coingecko_stub,
+                                                             server_commands, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many([dict(coin) for coin in COINS])
+    response = api_client.get("/v1/coins/search?q=bitc&limit=2", headers=auth_headers)
+    assert ids(response.json["data"]["coins"]) == ["bitcoin", "bitcoin-cash"]
+    index = current_search_index()
+
+    api_client.get("/v1/data_refresh")
+    assert refresh_scheduler.wait(10)
+    server_commands.clear()
+    response = api_client.get("/v1/coins/search?q=COIN04", headers=auth_headers)
+
+    assert ids(response.json["data"]["coins"]) == [f"coin04{i}" for i in range(10)]
+    assert current_search_index() is index
+    assert "find" not in server_commands
+    assert api_client.get("/v1/coins/search?q=", headers=auth_headers).status_code == 400
+    assert api_client.get("/v1/coins/search?q=bit&limit=500", headers=auth_headers).status_code == 400
@@ -0,0 +1,77 @@
+import datetime
+import gzip
+import json
+
+import pytest
+from flask import Flask
+from oslo_config import cfg
+
+from crypto_project.api.common import serialization
+from crypto_project.api.common.serialization import OrjsonSerializer
+from crypto_project.api.common.serialization import StdlibSerializer
+from crypto_project.api.common.utils import RestResponses
+
+BODY = {"coins": [{"coin_id": f"coin{i:04d}", "name": f"Coin {i}", "current_price_cad": i / 3,
+                   "categories": ["Masternodes"]} for i in range(200)],
+        "refreshed_at": datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def test_backends_encode_identically(app):
+    pytest.importorskip("orjson")
+    assert json.loads(OrjsonSerializer().dumps(BODY)) == json.loads(StdlibSerializer().dumps(BODY))
+
+
+@pytest.mark.parametrize("backend", ["stdlib", "orjson"])
+def test_responses_use_the_configured_backend(app, backend, monkeypatch):
+    monkeypatch.setattr(serialization, "_serializer", None)
+    cfg.CONF.set_override("json_backend", backend, group="response")
+    try:
+        with app.test_request_context():
+            response = RestResponses.success("ok", data={"answer": 42})
+        assert serialization.get_serializer().name == (backend if serialization.orjson else "stdlib")
+    finally:
+        cfg.CONF.clear_override("json_backend", group="response")
+        serialization._serializer = None
+    assert response.mimetype == "application/json"
+    assert response.json == {"status": "success", "message": "ok", "data": {"answer": 42}}
+
+
+def test_large_bodies_are_compressed_when_accepted(app):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        large = RestResponses.success("ok", data=BODY)
+        small = RestResponses.success("ok")
+    with app.test_request_context():
+        identity = RestResponses.success("ok", data=BODY)
+
+    assert large.content_encoding == "gzip" and "Accept-Encoding" in large.vary
+    assert json.loads(gzip.decompress(large.get_data()))["data"]["coins"] == json.loads(identity.get_data())["data"]["coins"]
+    assert len(large.get_data()) < len(identity.get_data()) / 4
+    assert small.content_encoding is None and "Accept-Encoding" in small.vary
+    assert identity.content_encoding is None
+
+
+def test_brotli_is_preferred_when_installed(app):
+    brotli = pytest.importorskip("brotli")
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        response = RestResponses.success("ok", data=BODY)
+    assert response.content_encoding == "br"
+    assert json.loads(brotli.decompress(response.get_data()))["status"] == "success"
+
+
+def test_cached_responses_keep_one_entry_per_encoding(api_client, auth_headers, mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many(
+        [{"coin_id": f"coin{i:04d}", "name": f"Coin {i}", "symbol": "c"} for i in range(100)])
+
+    compressed = api_client.get("/v1/coins", headers=dict(auth_headers, **{"Accept-Encoding": "gzip"}))
+    plain = api_client.get("/v1/coins", headers=auth_headers)
+
+    assert compressed.content_encoding == "gzip" and plain.content_encoding is None
+    assert json.loads(gzip.decompress(compressed.get_data())) == plain.json
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+from crypto_project.api.common.snapshot import MarketSnapshot
+from crypto_project.api.v1.actions import refresh_scheduler
+
+
+def coin(coin_id, change, /, *, categories=("Masternodes",), price=1.0):
+    return {"coin_id": coin_id, "name": coin_id.upper(), "categories": list(categories),
+            "market_data": {"current_price": {"usd": price, "cad": price * 1.4},
+                            "market_cap": {"usd": price * 1000},
+                            "price_change_percentage_24h": change}}
+
+
+COINS = [coin("a", 5.0), coin("b", -3.0, categories=["Layer 1 (L1)"]), coin("c", 12.0),
+         coin("d", None), coin("e", 0.5, categories=["Layer 1 (L1)", "Masternodes"])]
+
+
+def test_top_selects_and_orders_the_extremes():
+    snapshot = MarketSnapshot(COINS)
+
+    assert [row["coin_id"] for row in snapshot.top("change_24h", 2)] == ["c", "a"]
+    assert [row["coin_id"] for row in snapshot.top("change_24h", 2, ascending=True)] == ["b", "e"]
+    assert [row["coin_id"] for row in snapshot.top("change_24h", 10)] == ["c", "a", "e", "b"]
+    assert [row["coin_id"] for row in snapshot.top("change_24h", 5, category="Layer 1 (L1)")] == ["e", "b"]
+    assert snapshot.top("change_24h", 5, category="Unknown") == []
+    assert snapshot.top("price", 1)[0] == {"coin_id": "a", "name": "A", "price": 1.0, "market_cap": 1000.0,
+                                           "volume": None, "change_24h": 5.0, "change_7d": None,
+                                           "market_cap_change_24h": None}
+    assert math.isnan(snapshot.columns["change_24h"][3])
+    with pytest.raises(ValueError):
+        snapshot.top("popularity", 1)
+
+
+def test_top_endpoint_is_served_without_mongo(api_client, auth_headers, coingecko_stub, server_commands,
+                                              mongo_client):
+    mongo_client.crypto_db.coin_details.insert_many([dict(document) for document in COINS])
+    first = api_client.get("/v1/coins/top?metric=change_24h&n=2", headers=auth_headers)
+    assert [row["coin_id"] for row in first.json["data"]["coins"]] == ["c", "a"]
+
+    server_commands.clear()
+    again = api_client.get("/v1/coins/top?metric=change_24h&n=3&category=Masternodes", headers=auth_headers)
+    assert [row["coin_id"] for row in again.json["data"]["coins"]] == ["c", "a", "e"]
+    assert server_commands == []
+    assert api_client.get("/v1/coins/top?metric=popularity", headers=auth_headers).status_code == 400
+    assert api_client.get("/v1/coins/top?n=0", headers=auth_headers).status_code == 400
+
+    api_client.get("/v1/data_refresh")
+    assert refresh_scheduler.wait(10)
+    server_commands.clear()
+    response = api_client.get("/v1/coins/top?metric=price&n=1", headers=auth_headers)
+    assert response.json["data"]["coins"][0]["coin_id"] == "coin049"
+    assert server_commands == []
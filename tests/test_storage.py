@@ -0,0 +1,39 @@
+from crypto_project.api.common.storage import StorageSchema
+from crypto_project.api.v1.actions import CoinDetails
+
+
+def test_split_keeps_whitelisted_paths_hot():
+    schema = StorageSchema(["name", "market_data.current_price"])
+    coin = {
+        "name": "Bitcoin",
+        "description": {"en": "Bitcoin is..."},
+        "market_data": {"current_price": {"cad": 1.0}, "ath": {"cad": 2.0}},
+    }
+
+    hot, cold = schema.split(coin)
+
+    assert hot == {"name": "Bitcoin", "market_data": {"current_price": {"cad": 1.0}}}
+    assert cold == {"description": {"en": "Bitcoin is..."}, "market_data": {"ath": {"cad": 2.0}}}
+
+
+def test_parent_path_keeps_whole_subdocument():
+    schema = StorageSchema(["market_data.current_price", "market_data"])
+
+    hot, cold = schema.split({"market_data": {"current_price": {}, "ath": {}}})
+
+    assert hot == {"market_data": {"current_price": {}, "ath": {}}}
+    assert cold == {}
+
+
+def test_refresh_moves_bulky_fields_to_archive(coingecko_stub, mongo_client):
+    for coin in coingecko_stub.coins.values():
+        coin["localization"] = dict((language, coin["name"] * 50) for language in ("de", "fr", "ja"))
+
+    stats = CoinDetails().data_refresh().json["data"]
+
+    db = mongo_client.crypto_db
+    coin = db.coin_details.find_one({"coin_id": "coin001"})
+    assert "localization" not in coin
+    assert coin["market_data"]["current_price"]["cad"] == 1.0
+    assert db.coin_details_archive.find_one({"coin_id": "coin001"})["localization"]["de"]
+    assert stats["bytes_saved"] > 50 * 3 * 50 * len("coin001")